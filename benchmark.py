@@ -0,0 +1,220 @@
+import argparse
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
+import resource
+import sys
+import time
+import numpy as np
+import distances
+import mapfalgo
+import tateo
+import instrumentation
+import graphstore
+import instances
+
+#Benchmark of the solvers (divide and conquer: mapf_algo, 2nd version: best_choice, Tateo) on seeded instances,
+#on the map1.png graphs and on synthetic grids of increasing size. Each run is done in its own process, killed after the timeout
+#peak_memory_kb: growth of the resident set of the process during the run (the graphs loaded before are not counted)
+#searches: BFS tables of the distance oracle + A* runs. The oracle is put in "lazy" mode for the run, so only the tables
+#needed by the instance are counted (the "dense" mode of the small graphs computes all of them at the first query)
+#Usage: python benchmark.py --grids 10,20,40 --agents 5,10,20 --seeds 3 --timeout 60 --csv results.csv --summary summary.csv
+
+map_files = {"map1": ("map1.png_phys_uniform_grid_1_range_6.graphml", "map1.png_comm_uniform_grid_1_range_6.graphml")}
+grid_radius = 6
+all_solvers = ["mapf_algo", "best_choice", "tateo"]
+fields = ["map", "vertices", "agents", "seed", "solver", "status", "success", "wall_time", "peak_memory_kb",
+          "makespan", "conflicts", "path_queries", "searches"]
+summary_fields = ["map", "vertices", "agents", "solver", "runs", "successes", "success_rate", "median_wall_time"]
+
+
+def run_solver(solver, G_M, G_C, sources, targets):
+    if solver == "mapf_algo":
+        return mapfalgo.mapf_algo(G_M, G_C, sources, targets)
+    if solver == "best_choice":
+        return mapfalgo.best_choice(sources, targets, G_C, G_M, mapfalgo.nb_recursion)
+    if solver == "tateo":
+        return tateo.tateo(G_M, G_C, sources, targets)
+    raise ValueError("unknown solver: " + solver)
+
+
+def _rss_status(field):
+    '''Value in kB of a field of /proc/self/status (VmRSS, VmHWM), None if it can't be read'''
+    try:
+        with open("/proc/self/status") as f:
+            for line in f :
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _start_memory():
+    '''Reset the peak of the resident set (a forked process starts with the peak of its parent)
+    Output: resident set in kB when the run starts'''
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5") #Linux: VmHWM is set back to the current VmRSS
+        rss = _rss_status("VmRSS")
+        if rss != None :
+            return ("status", rss)
+    except OSError:
+        pass
+    return ("rusage", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) #only the growth above the inherited peak is seen
+
+
+def _peak_memory_growth(start):
+    source, baseline = start
+    if source == "status":
+        peak = _rss_status("VmHWM")
+    else :
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return None if peak == None else max(0, peak - baseline)
+
+
+def _worker(conn, solver, G_M, G_C, sources, targets, seed):
+    np.random.seed(seed)
+    distances.get_oracle(G_M, "lazy") #tables computed by this run only (see searches)
+    instrumentation.reset()
+    instrumentation.enable()
+    memory = _start_memory()
+    res = {"status": "ok", "success": False, "makespan": None, "conflicts": None}
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec = run_solver(solver, G_M, G_C, sources, targets)
+    except ImportError as e:
+        exec = None
+        res["status"] = "unavailable: " + str(e)
+    except Exception as e:
+        exec = None
+        res["status"] = "error: " + repr(e)
+    res["wall_time"] = time.perf_counter() - start
+    try:
+        res["peak_memory_kb"] = _peak_memory_growth(memory)
+        counters = instrumentation.counters
+        res["path_queries"] = counters.get("path_queries", 0)
+        res["searches"] = counters.get("astar_calls", 0) + counters.get("bfs_tables", 0)
+        res["report"] = instrumentation.report()
+        if exec != None :
+            array = np.asarray(exec)
+            res["makespan"] = array.shape[1]
+            res["conflicts"] = mapfalgo.nb_conflicts(array, G_C)
+            res["success"] = res["conflicts"] == 0 and list(array[:, 0]) == list(sources) and list(array[:, -1]) == list(targets)
+        elif res["status"] == "ok":
+            res["status"] = "no solution"
+    except Exception as e: #a result is always sent, the measures done so far are kept
+        res["status"] = "error after the run: " + repr(e)
+        res["success"] = False
+    conn.send(res)
+    conn.close()
+
+
+def run_one(solver, G_M, G_C, sources, targets, seed, timeout):
+    '''Run a solver in a new process, killed after timeout seconds
+    Output: dict of measures (status "timeout", or "crashed (exitcode N)" if the process died without result)'''
+    ctx = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else multiprocessing
+    receiver, sender = ctx.Pipe(False)
+    process = ctx.Process(target = _worker, args = (sender, solver, G_M, G_C, sources, targets, seed))
+    start = time.perf_counter()
+    process.start()
+    sender.close() #only the worker holds the sending end: if it dies, the receiver sees the end of the pipe
+    try:
+        if receiver.poll(timeout):
+            res = receiver.recv()
+        else :
+            res = {"status": "timeout", "success": False, "wall_time": time.perf_counter() - start}
+    except EOFError: #the worker died without sending its result (killed for memory, crashed...)
+        process.join()
+        res = {"status": "crashed (exitcode " + str(process.exitcode) + ")", "success": False,
+               "wall_time": time.perf_counter() - start}
+    process.terminate()
+    process.join()
+    receiver.close()
+    return res
+
+
+def graph_pairs(maps, grids):
+    '''Output: list of (name, G_M, G_C), bundled maps first then grids (side x side)'''
+    pairs = []
+    for name in maps :
+        G_Mname, G_Cname = map_files[name]
+        pairs.append((name, graphstore.load_graph(G_Mname), graphstore.load_graph(G_Cname)))
+    for side in grids :
+        G_M, G_C = instances.grid_graphs(side, side, grid_radius)
+        pairs.append(("grid" + str(side), G_M, G_C))
+    return pairs
+
+
+def benchmark(maps, grids, agents, seeds, solvers, timeout, log = sys.stderr):
+    '''Output: list of rows (dict with the keys of fields)'''
+    rows = []
+    for name, G_M, G_C in graph_pairs(maps, grids):
+        for nb_agent in agents :
+            for seed in range(seeds):
+                np.random.seed(seed)
+                sources, targets = instances.random_instance(G_M, G_C, nb_agent)
+                for solver in solvers :
+                    res = run_one(solver, G_M, G_C, sources, targets, seed, timeout)
+                    row = {"map": name, "vertices": G_M.vcount(), "agents": nb_agent, "seed": seed, "solver": solver}
+                    row.update(res)
+                    rows.append(row)
+                    if log != None :
+                        print(name, nb_agent, seed, solver, row["status"], round(row["wall_time"], 3), file = log)
+    return rows
+
+
+def summarize(rows):
+    '''Success rate of each solver for each (map, number of agents)
+    Output: list of rows (dict with the keys of summary_fields)'''
+    groups = {}
+    for row in rows :
+        groups.setdefault((row["map"], row["vertices"], row["agents"], row["solver"]), []).append(row)
+    summary = []
+    for (name, vertices, agents, solver), group in groups.items():
+        successes = sum(1 for row in group if row["success"])
+        summary.append({"map": name, "vertices": vertices, "agents": agents, "solver": solver, "runs": len(group),
+                        "successes": successes, "success_rate": successes/len(group),
+                        "median_wall_time": float(np.median([row["wall_time"] for row in group]))})
+    return summary
+
+
+def write_csv(rows, f, fieldnames = fields):
+    writer = csv.DictWriter(f, fieldnames = fieldnames, extrasaction = "ignore")
+    writer.writeheader()
+    for row in rows :
+        writer.writerow(row)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = "Benchmark of mapf_algo, best_choice and tateo")
+    parser.add_argument("--maps", default = "map1", help = "bundled maps (comma separated, empty for none)")
+    parser.add_argument("--grids", default = "10,20,40", help = "sides of the synthetic grids")
+    parser.add_argument("--agents", default = "3,5,10,20")
+    parser.add_argument("--seeds", type = int, default = 3)
+    parser.add_argument("--solvers", default = ",".join(all_solvers))
+    parser.add_argument("--timeout", type = float, default = 60)
+    parser.add_argument("--csv", help = "write the results in this file (default: stdout)")
+    parser.add_argument("--summary", help = "write the success rates in this file (default: stderr)")
+    parser.add_argument("--json", help = "write the results and the success rates in this file")
+    args = parser.parse_args()
+    split = lambda s : [x for x in s.split(",") if x != ""]
+    rows = benchmark(split(args.maps), [int(x) for x in split(args.grids)], [int(x) for x in split(args.agents)],
+                     args.seeds, split(args.solvers), args.timeout)
+    if args.csv :
+        with open(args.csv, "w", newline = "") as f:
+            write_csv(rows, f)
+    else :
+        write_csv(rows, sys.stdout)
+    summary = summarize(rows)
+    if args.summary :
+        with open(args.summary, "w", newline = "") as f:
+            write_csv(summary, f, summary_fields)
+    else :
+        write_csv(summary, sys.stderr, summary_fields)
+    if args.json :
+        with open(args.json, "w") as f:
+            json.dump({"runs": rows, "summary": summary}, f, indent = 1, default = str)
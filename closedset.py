@@ -0,0 +1,105 @@
+import hashlib
+import sys
+
+#Closed set of Tateo: configurations already visited, packed in one integer each (bits_per_vertex bits per agent)
+#"exact" mode: a set of these integers. "bloom" mode: Bloom filter of max_bytes bytes, which can give false positives
+#(a configuration not visited is seen as closed and isn't tried) but never grows.
+#In exact mode, once the estimated memory reaches max_bytes, the set is moved into a Bloom filter of this size
+
+max_bytes = 64 * 2**20 #memory cap of a closed set, size of the Bloom filters (None: no cap)
+nb_hashes = 4 #number of bits set for each configuration in a Bloom filter
+
+
+class ClosedSet:
+    '''Visited configurations (tuples of vertices) of one search'''
+
+    def __init__(self, nb_vertices, nb_agents, mode = "exact", memory_cap = -1):
+        '''Input: number of vertices of G_M, number of agents, mode ("exact" or "bloom"),
+        memory_cap in bytes (default: max_bytes, None: no cap, only for the exact mode)'''
+        if memory_cap == -1 :
+            memory_cap = max_bytes
+        if mode == "bloom" and memory_cap == None :
+            raise ValueError("a Bloom filter needs a memory cap")
+        self.bits_per_vertex = max(1, (nb_vertices-1).bit_length())
+        self.memory_cap = memory_cap
+        self.key_bytes = (nb_agents*self.bits_per_vertex + 7) // 8 #size of a key for the hash of the Bloom filter
+        self.bytes_per_key = sys.getsizeof(1 << (nb_agents*self.bits_per_vertex)) #python int of nb_agents*bits_per_vertex bits
+        self.mode = None
+        self.keys = set()
+        self.bits = None
+        self.nb_entries = 0
+        self.lookups = 0
+        self.hits = 0
+        if mode == "bloom":
+            self._to_bloom()
+        elif mode == "exact":
+            self.mode = "exact"
+        else :
+            raise ValueError("unknown closed set mode: " + str(mode))
+
+    def _key(self, config):
+        key = 0
+        for v in config :
+            key = (key << self.bits_per_vertex) | v
+        return key
+
+    def _positions(self, key):
+        '''Bits of key in the Bloom filter: double hashing h1 + i*h2, h1 and h2 being the two halves of a blake2b digest of the
+        whole key (hash() of a python int is the int itself for small ones: it would only see the last agents)'''
+        nb_bits = len(self.bits) * 8
+        digest = hashlib.blake2b(key.to_bytes(self.key_bytes, "little"), digest_size = 16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i*h2) % nb_bits for i in range(nb_hashes)]
+
+    def _to_bloom(self):
+        '''Move the keys into a Bloom filter of memory_cap bytes'''
+        self.bits = bytearray(self.memory_cap)
+        self.mode = "bloom"
+        for key in self.keys :
+            self._set_bits(key)
+        self.keys = set()
+
+    def _set_bits(self, key):
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def add(self, config):
+        key = self._key(config)
+        if self.mode == "exact":
+            if not(key in self.keys):
+                self.keys.add(key)
+                self.nb_entries += 1
+                if self.memory_cap != None and self.memory_bytes() >= self.memory_cap :
+                    self._to_bloom()
+        else :
+            self._set_bits(key)
+            self.nb_entries += 1 #configurations added again are counted again
+
+    def __contains__(self, config):
+        key = self._key(config)
+        if self.mode == "exact":
+            found = key in self.keys
+        else :
+            found = True
+            for p in self._positions(key):
+                if not(self.bits[p >> 3] & (1 << (p & 7))):
+                    found = False
+                    break
+        self.lookups += 1
+        self.hits += found
+        return found
+
+    def __len__(self):
+        return self.nb_entries
+
+    def memory_bytes(self):
+        '''Estimated memory used by the keys (table of the set + the integers)'''
+        if self.mode == "exact":
+            return sys.getsizeof(self.keys) + len(self.keys)*self.bytes_per_key
+        return len(self.bits)
+
+    def stats(self):
+        '''Output: dict {"mode", "entries", "memory_bytes", "lookups", "hits", "hit_rate"}'''
+        return {"mode": self.mode, "entries": self.nb_entries, "memory_bytes": self.memory_bytes(), "lookups": self.lookups,
+                "hits": self.hits, "hit_rate": self.hits/self.lookups if self.lookups > 0 else 0.0}
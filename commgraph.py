@@ -0,0 +1,87 @@
+import math
+import numpy as np
+import heuristics
+
+#Implicit communication graph: two vertices communicate if their euclidean distance is at most the radius
+#(the *_comm_uniform_grid_1_range_6.graphml files are these graphs with radius 6 on the coordinates of G_M).
+#Nothing is stored but the coordinates and a spatial grid of cells of side radius: the neighbours of v
+#are among the vertices of the 3x3 cells around the cell of v
+#It answers the calls of the solvers on G_C (vcount, neighbors, are_connected, get_adjlist), and
+#connectivity.CommAdjacency computes its links from the coordinates instead of an adjacency matrix
+
+tolerance = 1e-9 #distances up to radius + tolerance are in range (coordinates read from files aren't exact)
+
+
+class RangeCommGraph:
+    '''Communication graph given by the coordinates of the vertices and a communication radius'''
+
+    def __init__(self, x, y, radius):
+        self.x = np.asarray(x, dtype = np.float64)
+        self.y = np.asarray(y, dtype = np.float64)
+        self.radius = radius
+        self.max_sq = (radius + tolerance)**2
+        self.x_list = self.x.tolist()
+        self.y_list = self.y.tolist()
+        self.origin = (float(self.x.min()), float(self.y.min())) if len(self.x) > 0 else (0.0, 0.0)
+        self.cells = {} #(cx, cy) -> array of the vertices in the cell
+        cells_x, cells_y = self._cell(self.x, self.y)
+        order = np.lexsort((cells_y, cells_x))
+        keys = np.stack((cells_x[order], cells_y[order]), axis = 1)
+        starts = np.flatnonzero(np.any(np.diff(keys, axis = 0) != 0, axis = 1)) + 1
+        for block in np.split(order, starts):
+            if len(block) > 0 :
+                self.cells[(int(cells_x[block[0]]), int(cells_y[block[0]]))] = np.sort(block)
+
+    @classmethod
+    def from_graph(cls, G, radius):
+        '''Range graph on the vertices of G (x_coord / y_coord attributes), usually the movement graph'''
+        coords = heuristics.get_coordinates(G)
+        return cls(coords.x, coords.y, radius)
+
+    def _cell(self, x, y):
+        if self.radius <= 0 :
+            return np.zeros(np.shape(x), dtype = np.int64), np.zeros(np.shape(y), dtype = np.int64)
+        return (np.floor((x - self.origin[0]) / self.radius).astype(np.int64),
+                np.floor((y - self.origin[1]) / self.radius).astype(np.int64))
+
+    def vcount(self):
+        return len(self.x)
+
+    def is_directed(self):
+        return False
+
+    def in_range(self, u, v):
+        '''Vectorized: True where the vertices u and v (arrays of the same shape, or broadcastable) communicate,
+        a vertex is in range of itself'''
+        dx = self.x[u] - self.x[v]
+        dy = self.y[u] - self.y[v]
+        return dx*dx + dy*dy <= self.max_sq
+
+    def are_connected(self, u, v):
+        '''True if u != v are in range (same result as igraph's are_connected on the explicit graph)'''
+        u, v = int(u), int(v)
+        return u != v and (self.x_list[u]-self.x_list[v])**2 + (self.y_list[u]-self.y_list[v])**2 <= self.max_sq
+
+    def near_vertices(self, v):
+        '''Output: array of the vertices in range of v (v included), from the 3x3 cells around v'''
+        v = int(v)
+        if self.radius <= 0 :
+            candidates = self.cells.get((0, 0), np.zeros(0, dtype = np.int64))
+        else :
+            cx = math.floor((self.x_list[v] - self.origin[0]) / self.radius)
+            cy = math.floor((self.y_list[v] - self.origin[1]) / self.radius)
+            blocks = [self.cells[(cx+dx, cy+dy)] for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (cx+dx, cy+dy) in self.cells]
+            candidates = np.concatenate(blocks)
+        return np.sort(candidates[self.in_range(candidates, v)])
+
+    def neighbors(self, v, mode = "all"):
+        '''Neighbours of v (sorted list, v excluded), as igraph's Graph.neighbors'''
+        near = self.near_vertices(v)
+        return near[near != int(v)].tolist()
+
+    def get_adjlist(self, mode = "all"):
+        '''Explicit adjacency lists (builds the whole graph: for the small graphs only)'''
+        return [self.neighbors(v) for v in range(self.vcount())]
+
+    def ecount(self):
+        return sum(len(self.near_vertices(v)) - 1 for v in range(self.vcount())) // 2
@@ -0,0 +1,240 @@
+import itertools
+import weakref
+import numpy as np
+import commgraph
+
+
+matrix_max_vertices = 8192 #above this size the adjacency is kept as a sorted array of edge keys instead of a boolean matrix
+
+#Connectivity engine for the communication graph G_C
+#configs: array (nb of timesteps x nb of agents), configs[t][a] is the vertex of agent a at time t
+#Two agents on the same vertex can communicate (collisions are not handled)
+
+
+class CommAdjacency:
+    '''Communication adjacency built once per G_C: boolean matrix (with a True diagonal) for small graphs,
+    for large ones the sorted array of the keys u*nb_vertices+v of the links (diagonal included), searched with np.searchsorted
+    so that the queries on many pairs stay vectorized. A commgraph.RangeCommGraph is used as it is (implicit mode): the links are
+    computed from the coordinates, nothing of size nb_vertices^2 or nb_edges is built'''
+
+    def __init__(self, G_C):
+        self.nb_vertices = G_C.vcount()
+        self.implicit = None
+        if isinstance(G_C, commgraph.RangeCommGraph):
+            self.implicit = G_C
+            self.adjlist = None
+            self.matrix = None
+            self.edge_keys = None
+            return
+        adjlist = G_C.get_adjlist(mode = "all")
+        self.adjlist = adjlist
+        if self.nb_vertices <= matrix_max_vertices :
+            self.matrix = np.zeros((self.nb_vertices, self.nb_vertices), dtype = bool)
+            for v in range(self.nb_vertices):
+                self.matrix[v, adjlist[v]] = True
+            np.fill_diagonal(self.matrix, True)
+            self.edge_keys = None
+        else :
+            self.matrix = None
+            degrees = np.fromiter(map(len, adjlist), dtype = np.int64, count = self.nb_vertices)
+            src = np.repeat(np.arange(self.nb_vertices, dtype = np.int64), degrees)
+            dst = np.fromiter(itertools.chain.from_iterable(adjlist), dtype = np.int64, count = int(degrees.sum()))
+            diagonal = np.arange(self.nb_vertices, dtype = np.int64) * (self.nb_vertices + 1)
+            self.edge_keys = np.unique(np.concatenate((src*self.nb_vertices + dst, diagonal)))
+
+    def _linked(self, u, v):
+        '''Vectorized: True where u and v (arrays of the same shape, or broadcastable) communicate (edge_keys mode)'''
+        keys = np.asarray(u, dtype = np.int64)*self.nb_vertices + np.asarray(v, dtype = np.int64)
+        k = np.searchsorted(self.edge_keys, keys)
+        return self.edge_keys[np.minimum(k, len(self.edge_keys)-1)] == keys
+
+    def are_connected(self, u, v):
+        '''True if u and v can communicate (or u == v)'''
+        if self.matrix is not None :
+            return bool(self.matrix[u, v])
+        if self.implicit is not None :
+            return u == v or self.implicit.are_connected(u, v)
+        return bool(self._linked(u, v))
+
+    def agent_neighbours(self, config):
+        '''Communication links between the agents of one configuration. The agents are indexed by vertex, so each occupied
+        vertex only looks at its neighbours in G_C or at the other occupied vertices, whichever list is the shortest
+        Output: list, [a] is the list of the agents communicating with a (a excluded)'''
+        vertex_agents = {} #vertex -> agents on it
+        for a in range(len(config)):
+            vertex_agents.setdefault(int(config[a]), []).append(a)
+        neighbours = [None for a in range(len(config))]
+        for v, agents in vertex_agents.items():
+            if self.adjlist is not None and len(self.adjlist[v]) < len(vertex_agents):
+                near = [w for w in self.adjlist[v] if w in vertex_agents]
+            else :
+                near = [w for w in vertex_agents if w != v and self.are_connected(v, w)]
+            near_agents = [b for w in near for b in vertex_agents[w]]
+            for a in agents :
+                neighbours[a] = [b for b in agents if b != a] + near_agents
+        return neighbours
+
+    def neighbourhood(self, vertices):
+        '''Output: boolean array of length nb_vertices, True for the vertices communicating with at least one of vertices'''
+        vertices = [int(v) for v in vertices]
+        if self.matrix is not None :
+            return np.any(self.matrix[vertices], axis = 0)
+        res = np.zeros(self.nb_vertices, dtype = bool)
+        for v in vertices :
+            if self.implicit is not None :
+                res[self.implicit.near_vertices(v)] = True
+            else :
+                res[self.adjlist[v]] = True
+                res[v] = True
+        return res
+
+    def adjacent_to(self, vertices, configs):
+        '''Output: boolean array (k x A), [k, a] is True if vertices[k] communicates with configs[k][a]'''
+        vertices = np.asarray(vertices, dtype = np.int64)
+        if self.matrix is not None :
+            return self.matrix[vertices[:, None], configs]
+        if self.implicit is not None :
+            return self.implicit.in_range(vertices[:, None], np.asarray(configs, dtype = np.int64))
+        return self._linked(vertices[:, None], configs)
+
+    def pair_matrix(self, configs):
+        '''Output: boolean array (T x A x A), [t, a, b] is True if agents a and b communicate at time t'''
+        if self.matrix is not None :
+            return self.matrix[configs[:, :, None], configs[:, None, :]]
+        if self.implicit is not None :
+            return self.implicit.in_range(configs[:, :, None], configs[:, None, :])
+        return self._linked(configs[:, :, None], configs[:, None, :])
+
+    def connected_configs(self, configs):
+        '''Check every configuration at once: agents reached from a_0 are propagated until nothing changes
+        Input: configs array (T x A)
+        Output: boolean array of length T, True if the configuration at t is connected'''
+        configs = np.asarray(configs, dtype = np.int64)
+        nb_t, nb_a = configs.shape
+        if nb_a <= 1 :
+            return np.ones(nb_t, dtype = bool)
+        pairs = self.pair_matrix(configs)
+        reached = pairs[:, 0, :].copy()
+        for _ in range(nb_a - 1):
+            new_reached = reached | np.any(reached[:, :, None] & pairs, axis = 1)
+            if np.array_equal(new_reached, reached):
+                break
+            reached = new_reached
+        return reached.all(axis = 1)
+
+    def components(self, configs):
+        '''Connected components of every configuration at once: the smallest agent id is propagated through the links
+        Input: configs array (T x A)
+        Output: labels array (T x A), labels[t][a] is the smallest agent of the component of a at time t (0 for the component of a_0)'''
+        configs = np.asarray(configs, dtype = np.int64)
+        nb_t, nb_a = configs.shape
+        labels = np.tile(np.arange(nb_a), (nb_t, 1))
+        if nb_a <= 1 :
+            return labels
+        pairs = self.pair_matrix(configs)
+        while True :
+            new_labels = np.min(np.where(pairs, labels[:, None, :], nb_a), axis = 2)
+            if np.array_equal(new_labels, labels):
+                return labels
+            labels = new_labels
+
+
+_adjacencies = {}
+
+def get_adjacency(G_C):
+    '''Adjacency of G_C, built at the first call and shared by every later call on the same graph object
+    (the graph must not be modified afterwards)'''
+    key = id(G_C)
+    if not(key in _adjacencies):
+        weakref.finalize(G_C, _adjacencies.pop, key, None)
+        _adjacencies[key] = CommAdjacency(G_C)
+    return _adjacencies[key]
+
+
+class ConflictTracker:
+    '''Connectivity of every configuration of an execution, kept up to date when an agent is added
+    labels[t][a] is the component of agent a at time t (the smallest agent of the component), nb_components[t] their number
+    Adding an agent (or testing one, conflicts_with_agent) only merges the components it communicates with'''
+
+    def __init__(self, exec, G_C, nb_timesteps = None):
+        '''Input: execution (possibly without agent, then nb_timesteps gives its length), communication graph'''
+        self.adjacency = get_adjacency(G_C)
+        self.array = np.array(exec, dtype = np.int64)
+        if self.array.ndim != 2 :
+            self.array = np.zeros((0, nb_timesteps), dtype = np.int64)
+        self.labels = self.adjacency.components(self.array.T)
+        self.nb_components = self._count_components(self.labels)
+
+    @property
+    def nb_agents(self):
+        return self.array.shape[0]
+
+    @property
+    def nb_timesteps(self):
+        return self.array.shape[1]
+
+    def nb_conflicts(self):
+        return int(np.count_nonzero(self.nb_components > 1))
+
+    def _count_components(self, labels):
+        return np.sum(labels == np.arange(labels.shape[1]), axis = 1)
+
+    def _touched(self, path, times):
+        '''Input: positions path[k] of an agent at the times times[k]
+        Output: boolean array (k x A), [k, c] is True if the agent communicates with the component c at times[k]'''
+        configs = self.array[:, times].T
+        adjacent = self.adjacency.adjacent_to(path, configs)
+        labels = self.labels[times]
+        touched = np.zeros(adjacent.shape, dtype = bool)
+        rows, cols = np.nonzero(adjacent)
+        touched[rows, labels[rows, cols]] = True
+        return touched
+
+    def _padded(self, path, nb_timesteps):
+        path = np.asarray(path, dtype = np.int64)
+        row = np.empty(nb_timesteps, dtype = np.int64)
+        row[:len(path)] = path
+        row[len(path):] = path[len(path)-1]
+        return row
+
+    def conflicts_with_agent(self, path, start = 0):
+        '''Conflicts of the execution if an agent following path is added (the tracker isn't modified).
+        If path is longer than the execution, the other agents wait at their last positions
+        Output: number of conflicts at the times >= start, first of these times (None if there is none)'''
+        nb_timesteps = max(self.nb_timesteps, len(path))
+        if self.nb_agents == 0 :
+            return 0, None
+        times = np.minimum(np.arange(start, nb_timesteps), self.nb_timesteps-1)
+        row = self._padded(path, nb_timesteps)[start:]
+        connected = np.sum(self._touched(row, times), axis = 1) == self.nb_components[times]
+        conflicts = np.flatnonzero(~connected)
+        return len(conflicts), (int(conflicts[0])+start if len(conflicts) > 0 else None)
+
+    def extend(self, nb_timesteps):
+        '''The agents wait at their last positions until nb_timesteps'''
+        missing = nb_timesteps - self.nb_timesteps
+        if missing <= 0 :
+            return
+        old = self.nb_timesteps
+        self.array = np.concatenate((self.array, np.repeat(self.array[:, old-1:], missing, axis = 1)), axis = 1)
+        self.labels = np.concatenate((self.labels, np.repeat(self.labels[old-1:], missing, axis = 0)), axis = 0)
+        self.nb_components = np.concatenate((self.nb_components, np.repeat(self.nb_components[old-1:], missing)))
+
+    def add_agent(self, path):
+        '''Add an agent following path: the components it communicates with are merged'''
+        self.extend(len(path))
+        row = self._padded(path, self.nb_timesteps)
+        nb_a = self.nb_agents
+        times = np.arange(self.nb_timesteps)
+        if nb_a == 0 :
+            new_labels = np.zeros(self.nb_timesteps, dtype = np.int64)
+            self.nb_components = np.ones(self.nb_timesteps, dtype = np.int64)
+        else :
+            touched = self._touched(row, times)
+            nb_touched = np.sum(touched, axis = 1)
+            new_labels = np.where(nb_touched > 0, np.argmax(touched, axis = 1), nb_a)
+            merged = touched[times[:, None], self.labels]
+            self.labels = np.where(merged, new_labels[:, None], self.labels)
+            self.nb_components = self.nb_components - nb_touched + 1
+        self.array = np.concatenate((self.array, row[None, :]), axis = 0)
+        self.labels = np.concatenate((self.labels, new_labels[:, None]), axis = 1)
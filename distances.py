@@ -0,0 +1,151 @@
+import weakref
+from collections import OrderedDict
+import numpy as np
+import instrumentation
+
+
+dense_max_vertices = 1000 #graphs up to this size get every table computed at once
+lru_max_bytes = 256 * 2**20 #memory of the tables kept by the "lru" mode (one table: 8*|V| bytes)
+
+#Shortest-path oracle for the movement graph G_M
+#For each goal g, a reverse BFS gives dist[v] = d(v, g) and next_hop[v] = the vertex after v on a shortest path from v to g
+#(-1 if g can't be reached from v)
+#On an undirected graph the table of g is also the BFS tree from g, so it answers the one-to-many queries from g
+
+
+class DistanceOracle:
+    '''Distance / next-hop oracle of an unweighted graph, filled with one reverse BFS per goal
+    Modes: "lazy" (tables computed when first needed and kept), "dense" (all-pairs, computed at creation),
+    "lru" (tables computed when first needed, at most max_goals kept: by default as many as fit in lru_max_bytes)
+    It also answers one-to-many queries (distances and paths from one source to every vertex) with one BFS tree'''
+
+    def __init__(self, G, mode = None, max_goals = None):
+        self.nb_vertices = G.vcount()
+        self.directed = G.is_directed()
+        self.adjlist = G.get_adjlist(mode = "in")
+        self.adjlist_out = G.get_adjlist(mode = "out") if self.directed else self.adjlist
+        if mode == None :
+            mode = "dense" if self.nb_vertices <= dense_max_vertices else "lru"
+        if not(mode in ("lazy", "dense", "lru")):
+            raise ValueError("unknown oracle mode: " + str(mode))
+        self.mode = mode
+        if max_goals == None :
+            max_goals = max(1, lru_max_bytes // max(1, 8*self.nb_vertices)) #dist and next_hop are int32
+        self.max_goals = max_goals
+        self.tables = OrderedDict()
+        self.tables_from = OrderedDict() #forward BFS trees, only used for directed graphs
+        if mode == "dense":
+            for goal in range(self.nb_vertices):
+                self.tables[goal] = self._bfs(goal, self.adjlist)
+
+    def _bfs(self, root, adjlist):
+        '''BFS from root on adjlist (reverse BFS if adjlist gives the in-neighbours)
+        Output: (dist, next_hop) arrays, next_hop[v] is the parent of v in the BFS tree'''
+        if instrumentation.enabled :
+            instrumentation.count("bfs_tables")
+        dist = [-1]*self.nb_vertices
+        next_hop = [-1]*self.nb_vertices
+        dist[root] = 0
+        next_hop[root] = root
+        layer = [root]
+        d = 0
+        while len(layer) > 0 :
+            d += 1
+            next_layer = []
+            for x in layer :
+                for n in adjlist[x]:
+                    if dist[n] == -1 :
+                        dist[n] = d
+                        next_hop[n] = x
+                        next_layer.append(n)
+            layer = next_layer
+        return np.array(dist, dtype = np.int32), np.array(next_hop, dtype = np.int32)
+
+    def _cached(self, tables, root, adjlist):
+        root = int(root)
+        if root in tables :
+            if self.mode == "lru":
+                tables.move_to_end(root)
+            return tables[root]
+        t = self._bfs(root, adjlist)
+        tables[root] = t
+        if self.mode == "lru" :
+            #the forward trees of a directed graph share the same budget
+            other = self.tables_from if tables is self.tables else self.tables
+            while len(self.tables) + len(self.tables_from) > self.max_goals :
+                if len(tables) > 1 : #t itself is kept
+                    tables.popitem(last = False)
+                else :
+                    other.popitem(last = False)
+        return t
+
+    def table(self, goal):
+        '''Output: (dist, next_hop) arrays toward goal'''
+        return self._cached(self.tables, goal, self.adjlist)
+
+    def distance(self, source, goal):
+        '''Number of moves from source to goal, -1 if there is no path'''
+        return int(self.table(goal)[0][source])
+
+    def distances_to(self, goal):
+        '''Many-to-one: array of d(v, goal) for every vertex v (-1 if there is no path)'''
+        return self.table(goal)[0]
+
+    def distances_from(self, source):
+        '''One-to-many: array of d(source, v) for every vertex v (-1 if there is no path)'''
+        if not(self.directed):
+            return self.table(source)[0]
+        return self._cached(self.tables_from, source, self.adjlist_out)[0]
+
+    def path(self, source, goal):
+        '''Output: shortest path from source to goal (list of vertices), None if there is no path'''
+        dist, next_hop = self.table(goal)
+        source = int(source)
+        if dist[source] == -1 :
+            return None
+        path = [source]*(dist[source]+1)
+        x = source
+        for k in range(1, len(path)):
+            x = int(next_hop[x])
+            path[k] = x
+        return path
+
+    def path_from(self, source, v):
+        '''Shortest path from source to v read in the BFS tree of source (same tree for every v), None if there is no path'''
+        if not(self.directed):
+            path = self.path(v, source)
+        else :
+            dist, parent = self._cached(self.tables_from, source, self.adjlist_out)
+            v = int(v)
+            if dist[v] == -1 :
+                return None
+            path = [v]
+            for _ in range(dist[v]):
+                path.append(int(parent[path[-1]]))
+        if path == None :
+            return None
+        path.reverse()
+        return path
+
+    def pred(self, source, goal):
+        '''Output: array of predecessors along the shortest path (same format as get_pred_Astar), None if there is no path'''
+        path = self.path(source, goal)
+        if path == None :
+            return None
+        pred = [-1]*self.nb_vertices
+        for k in range(1, len(path)):
+            pred[path[k]] = path[k-1]
+        return pred
+
+
+_oracles = {}
+
+def get_oracle(G, mode = None):
+    '''Oracle of G, created at the first call and shared by every later call on the same graph object
+    (the graph must not be modified afterwards)'''
+    key = id(G)
+    if not(key in _oracles) or (mode != None and _oracles[key].mode != mode):
+        if not(key in _oracles):
+            weakref.finalize(G, _oracles.pop, key, None)
+        _oracles[key] = DistanceOracle(G, mode)
+    return _oracles[key]
@@ -0,0 +1,87 @@
+import numpy as np
+
+#Execution: paths of all the agents, stored in a single (nb of agents x nb of timesteps) integer array
+#exec[a] is the path of agent a (a view of the array), exec[a][t] its position at time t
+
+
+class Execution:
+    '''Array-backed execution. Slicing agents or time returns views of the same array, nothing is copied'''
+
+    def __init__(self, array):
+        self.array = np.asarray(array, dtype = np.int64)
+        if self.array.ndim != 2 :
+            raise ValueError("an execution is a 2D array (agents x time)")
+
+    @classmethod
+    def from_paths(cls, paths):
+        '''Build an execution from paths of different lengths: the shorter ones wait at their arrivals
+        (one allocation, the waiting part of each row is filled at once)'''
+        max_t = max(map(len, paths))
+        array = np.empty((len(paths), max_t), dtype = np.int64)
+        for a in range(len(paths)):
+            p = paths[a]
+            array[a, :len(p)] = p
+            array[a, len(p):] = p[len(p)-1]
+        return cls(array)
+
+    def __len__(self):
+        return self.array.shape[0]
+
+    def __getitem__(self, key):
+        '''exec[a] gives the path of a, exec[a:b] or exec[[a, b...]] the execution of these agents,
+        exec[a, t] / exec[:, t0:t1] index the array directly'''
+        if isinstance(key, (int, np.integer)):
+            return self.array[key]
+        res = self.array[key]
+        if isinstance(res, np.ndarray) and res.ndim == 2 :
+            return Execution(res)
+        return res
+
+    def __iter__(self):
+        return iter(self.array)
+
+    def __array__(self, dtype = None, copy = None):
+        if dtype is None :
+            return self.array
+        return self.array.astype(dtype)
+
+    def __repr__(self):
+        return "Execution(" + repr(self.array.tolist()) + ")"
+
+    @property
+    def nb_timesteps(self):
+        return self.array.shape[1]
+
+    def config(self, t):
+        '''Configuration at time t (view)'''
+        return self.array[:, t]
+
+    def time_slice(self, start, stop = None):
+        '''Execution between times start and stop-1 (view)'''
+        return Execution(self.array[:, start:stop])
+
+    def to_list(self):
+        '''Execution as a list of paths (lists of vertices)'''
+        return self.array.tolist()
+
+
+def concatenate(ex1, ex2):
+    '''Input: 2 executions with same number of agents, the last configuration of ex1 being the first of ex2
+    Output: the concatenation (in time) of the executions, in a new array (ex1 and ex2 are not modified)'''
+    ex1 = np.asarray(ex1)
+    ex2 = np.asarray(ex2)
+    return Execution(np.concatenate((ex1, ex2[:, 1:]), axis = 1))
+
+
+def add_agent(ex, path):
+    '''Input: execution, path of a new agent
+    Output: execution with the new agent as last agent (the shorter paths wait at their arrivals)'''
+    ex = np.asarray(ex)
+    nb_a, nb_t = ex.shape
+    nb_timesteps = max(nb_t, len(path))
+    array = np.empty((nb_a+1, nb_timesteps), dtype = np.int64)
+    array[:nb_a, :nb_t] = ex
+    array[:nb_a, nb_t:] = ex[:, nb_t-1:]
+    array[nb_a, :len(path)] = path
+    array[nb_a, len(path):] = path[len(path)-1]
+    return Execution(array)
@@ -0,0 +1,146 @@
+import hashlib
+import itertools
+import os
+import igraph
+import numpy as np
+
+#Binary store for the graphs (*_phys_*.graphml / *_comm_*.graphml)
+#A GraphML file is parsed once, then saved in cache_dir/v<format_version>-<sha1 of the file> as .npy arrays:
+#CSR adjacency (indptr, indices), x_coord and y_coord (if the vertices have coordinates), directed flag
+#The arrays are opened with np.load(mmap_mode = "r"), so loading a graph doesn't read the XML again
+#cache_dir/index/<sha1 of (path, size, mtime)> holds the sha1 of the file: the file is only hashed again when it changed
+
+cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "stage_algoMAPF", "graphs")
+coord_attributes = ["x_coord", "y_coord"]
+format_version = 2 #to change when the arrays saved change, the files of the other versions are then ignored
+
+_loaded = {} #(path, size, mtime) -> graph already loaded in this process
+
+
+def file_hash(filename):
+    '''sha1 of the content of the file'''
+    h = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for block in iter(lambda : f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def graph_to_arrays(G):
+    '''Input: igraph graph
+    Output: dict of arrays (CSR adjacency, coordinates, directed flag)'''
+    adjlist = G.get_adjlist(mode = "out")
+    indptr = np.zeros(G.vcount()+1, dtype = np.int64)
+    indptr[1:] = np.cumsum(np.fromiter(map(len, adjlist), dtype = np.int64, count = len(adjlist)))
+    indices = np.fromiter(itertools.chain.from_iterable(adjlist), dtype = np.int32, count = indptr[-1])
+    arrays = {"indptr": indptr, "indices": indices, "directed": np.array([G.is_directed()])}
+    for attr in coord_attributes :
+        if attr in G.vs.attributes():
+            arrays[attr] = np.array(G.vs[attr], dtype = np.float64)
+    return arrays
+
+
+def arrays_to_graph(arrays):
+    '''Inverse of graph_to_arrays (the edges are created in the order of the CSR arrays)'''
+    indptr, indices = arrays["indptr"], arrays["indices"]
+    directed = bool(arrays["directed"][0])
+    n = len(indptr)-1
+    src = np.repeat(np.arange(n), np.diff(indptr))
+    dst = np.asarray(indices, dtype = np.int64)
+    if not directed :
+        keep = src <= dst #each undirected edge appears in the lists of both ends
+        src, dst = src[keep], dst[keep]
+    #igraph reads the edges from an iterable of pairs: pairs of ints made on the fly are much faster than the rows of
+    #a numpy array (one array object per edge) and than a nested list (millions of objects followed by the garbage collector)
+    G = igraph.Graph(n = n, directed = directed)
+    G.add_edges(zip(src.tolist(), dst.tolist()))
+    for attr in coord_attributes :
+        if attr in arrays :
+            G.vs[attr] = np.asarray(arrays[attr])
+    return G
+
+
+def save_arrays(arrays, directory):
+    tmp = directory + ".tmp" + str(os.getpid())
+    os.makedirs(tmp, exist_ok = True)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, name + ".npy"), array)
+    try:
+        os.replace(tmp, directory)
+    except OSError: #another process wrote it first
+        for name in arrays :
+            os.remove(os.path.join(tmp, name + ".npy"))
+        os.rmdir(tmp)
+
+
+def load_arrays(directory):
+    arrays = {}
+    for f in os.listdir(directory):
+        if f.endswith(".npy"):
+            arrays[f[:-4]] = np.load(os.path.join(directory, f), mmap_mode = "r")
+    return arrays
+
+
+def _arrays_directory(content_hash):
+    return os.path.join(cache_dir, "v" + str(format_version) + "-" + content_hash)
+
+
+def _index_file(key):
+    return os.path.join(cache_dir, "index", hashlib.sha1(repr(key).encode()).hexdigest())
+
+
+def _indexed_hash(key):
+    '''sha1 of the file recorded for key = (path, size, mtime), None if there is none'''
+    try:
+        with open(_index_file(key)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _write_index(key, content_hash):
+    index_file = _index_file(key)
+    os.makedirs(os.path.dirname(index_file), exist_ok = True)
+    tmp = index_file + ".tmp" + str(os.getpid())
+    with open(tmp, "w") as f:
+        f.write(content_hash)
+    os.replace(tmp, index_file)
+
+
+def load_graph(filename):
+    '''Load a graph file, from the binary cache if it was already converted (it is converted otherwise)
+    Input: name of a graph file readable by igraph.read
+    Output: igraph graph (only the structure and the coordinates are kept)'''
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+    if key in _loaded :
+        return _loaded[key]
+    content_hash = _indexed_hash(key)
+    if content_hash == None or not(os.path.isdir(_arrays_directory(content_hash))):
+        content_hash = file_hash(filename)
+        _write_index(key, content_hash)
+    directory = _arrays_directory(content_hash)
+    if os.path.isdir(directory):
+        G = arrays_to_graph(load_arrays(directory))
+    else :
+        G = igraph.read(filename)
+        os.makedirs(cache_dir, exist_ok = True)
+        save_arrays(graph_to_arrays(G), directory)
+        #same vertices, neighbours and coordinates as the next loads (only the ids of the edges may differ)
+        for attr in G.vs.attributes():
+            if not(attr in coord_attributes):
+                del G.vs[attr]
+        for attr in G.es.attributes():
+            del G.es[attr]
+        for attr in G.attributes():
+            del G[attr]
+    _loaded[key] = G
+    return G
+
+
+def as_graph(G):
+    '''Input: graph object or name of a graph file
+    Output: graph object'''
+    if isinstance(G, (str, os.PathLike)):
+        return load_graph(G)
+    return G
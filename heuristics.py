@@ -0,0 +1,54 @@
+import math
+import weakref
+import numpy as np
+
+#Coordinates of the movement graph G_M (vertex attributes x_coord, y_coord) extracted once in contiguous arrays,
+#and distance heuristics toward a goal computed for many vertices in one call
+#On the uniform grids the cells are 1 apart and every move costs 1 (get_pred_Astar), diagonal ones included:
+#chebyshev is admissible on 4- and 8-connected grids, manhattan only on 4-connected ones. euclidean and octile count a
+#diagonal move as sqrt(2) and overestimate on 8-connected grids (A* may then return paths which aren't shortest)
+
+
+class Coordinates:
+    '''x_coord / y_coord of every vertex of G_M'''
+
+    def __init__(self, G_M):
+        self.x = np.array(G_M.vs["x_coord"], dtype = np.float64)
+        self.y = np.array(G_M.vs["y_coord"], dtype = np.float64)
+        self.x_list = self.x.tolist() #faster than the arrays for one vertex at a time
+        self.y_list = self.y.tolist()
+
+    def distance(self, goal, agent):
+        '''Euclidean distance between two vertices'''
+        return math.sqrt((self.x_list[agent]-self.x_list[goal])**2 + (self.y_list[agent]-self.y_list[goal])**2)
+
+    def heuristic(self, goal, vertices = None, metric = "euclidean"):
+        '''Input: goal, vertices (all the vertices if None), metric ("euclidean", "manhattan", "octile" or "chebyshev")
+        Output: array of the distances between each vertex and the goal'''
+        if vertices is None :
+            dx = np.abs(self.x - self.x[goal])
+            dy = np.abs(self.y - self.y[goal])
+        else :
+            vertices = np.asarray(vertices, dtype = np.int64)
+            dx = np.abs(self.x[vertices] - self.x[goal])
+            dy = np.abs(self.y[vertices] - self.y[goal])
+        if metric == "euclidean":
+            return np.sqrt(dx*dx + dy*dy)
+        if metric == "manhattan":
+            return dx + dy
+        if metric == "chebyshev":
+            return np.maximum(dx, dy)
+        if metric == "octile":
+            return np.maximum(dx, dy) + (math.sqrt(2)-1)*np.minimum(dx, dy)
+        raise ValueError("unknown metric: " + str(metric))
+
+
+_coordinates = {}
+
+def get_coordinates(G_M):
+    '''Coordinates of G_M, extracted at the first call and shared by every later call on the same graph object'''
+    key = id(G_M)
+    if not(key in _coordinates):
+        weakref.finalize(G_M, _coordinates.pop, key, None)
+        _coordinates[key] = Coordinates(G_M)
+    return _coordinates[key]
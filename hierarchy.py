@@ -0,0 +1,189 @@
+import heapq
+import math
+import weakref
+from collections import deque
+import numpy as np
+import distances
+import heuristics
+import instrumentation
+
+
+cluster_size = 16 #side of the square regions, in coordinate units (1 unit = 1 cell on the uniform grids)
+
+#Hierarchical shortest paths on large movement graphs (HPA*): the vertices are grouped in square regions using their
+#x_coord / y_coord. Between two neighbouring regions, each entrance (group of contiguous edges crossing the border)
+#is represented by one crossing edge, whose 2 ends are nodes of the abstract graph. The abstract graph links the nodes
+#of the same region (distance inside the region, by BFS at creation) and the 2 ends of each representative edge (distance 1)
+#A query searches the abstract graph, so its cost depends on the number of regions crossed, then refines each step with a
+#BFS limited to one region. Paths are shortest inside each region but may be a little longer than the shortest ones overall,
+#and a sub-path of a hierarchical path isn't the hierarchical path of its ends: the solvers (mapfalgo.get_path) don't use them
+
+
+class HierarchicalPaths:
+    '''Abstract graph of the regions of an undirected movement graph G_M'''
+
+    def __init__(self, G_M, size = None):
+        if G_M.is_directed():
+            raise ValueError("the hierarchy needs an undirected movement graph")
+        if size == None :
+            size = cluster_size
+        self.G_M = G_M
+        self.size = size
+        self.adjlist = distances.get_oracle(G_M).adjlist
+        coords = heuristics.get_coordinates(G_M)
+        self.coords = coords
+        cells_x = np.floor((coords.x - coords.x.min()) / size).astype(np.int64)
+        cells_y = np.floor((coords.y - coords.y.min()) / size).astype(np.int64)
+        self.region = (cells_y * (cells_x.max()+1) + cells_x).tolist()
+        self.nodes_of_region = {} #region -> abstract nodes (vertices of G_M) in it
+        self.abstract = {} #abstract node -> list of (abstract node, distance)
+        for v, w in self._entrances(coords):
+            for a, b in ((v, w), (w, v)):
+                if not(a in self.abstract):
+                    self.abstract[a] = []
+                    self.nodes_of_region.setdefault(self.region[a], []).append(a)
+                self.abstract[a].append((b, 1))
+        for nodes in self.nodes_of_region.values():
+            for a in nodes :
+                dist = self._local_bfs(a)[0]
+                for b in nodes :
+                    if b != a and b in dist :
+                        self.abstract[a].append((b, dist[b]))
+
+    def _entrances(self, coords):
+        '''Output: list of the representative crossing edges (v, w), one for each entrance between two regions'''
+        edges = np.array(self.G_M.get_edgelist(), dtype = np.int64).reshape(-1, 2)
+        region = np.array(self.region, dtype = np.int64)
+        crossing = edges[region[edges[:, 0]] != region[edges[:, 1]]]
+        #orientation: v in the region of smallest id
+        swap = region[crossing[:, 0]] > region[crossing[:, 1]]
+        crossing[swap] = crossing[swap][:, ::-1]
+        groups = {} #(region of v, region of w) -> crossing edges
+        for v, w in crossing.tolist():
+            groups.setdefault((self.region[v], self.region[w]), []).append((v, w))
+        representatives = []
+        for group in groups.values():
+            #two crossing edges are in the same entrance if their ends are equal or adjacent on both sides
+            parent = list(range(len(group)))
+            def find(e):
+                while parent[e] != e :
+                    parent[e] = parent[parent[e]]
+                    e = parent[e]
+                return e
+            by_v = {}
+            for e, (v, w) in enumerate(group):
+                by_v.setdefault(v, []).append(e)
+            for e, (v, w) in enumerate(group):
+                near_w = set(self.adjlist[w])
+                near_w.add(w)
+                for v2 in [v] + self.adjlist[v]:
+                    for e2 in by_v.get(v2, []):
+                        if group[e2][1] in near_w :
+                            parent[find(e2)] = find(e)
+            entrances = {}
+            for e in range(len(group)):
+                entrances.setdefault(find(e), []).append(group[e])
+            for entrance in entrances.values():
+                entrance.sort(key = lambda edge : (coords.x_list[edge[0]] + coords.x_list[edge[1]],
+                                                   coords.y_list[edge[0]] + coords.y_list[edge[1]]))
+                representatives.append(entrance[len(entrance)//2])
+        return representatives
+
+    def _local_bfs(self, root, goal = None):
+        '''BFS from root limited to the region of root (stops at goal if given)
+        Output: dict of the distances, dict of the parents'''
+        r = self.region[root]
+        dist = {root: 0}
+        parent = {root: root}
+        queue = deque([root])
+        while len(queue) > 0 :
+            x = queue.popleft()
+            if x == goal :
+                break
+            for n in self.adjlist[x]:
+                if not(n in dist) and self.region[n] == r :
+                    dist[n] = dist[x] + 1
+                    parent[n] = x
+                    queue.append(n)
+        return dist, parent
+
+    def _local_path(self, source, dest):
+        '''Shortest path from source to dest inside their region, None if there is none'''
+        if source == dest :
+            return [source]
+        parent = self._local_bfs(source, dest)[1]
+        if not(dest in parent):
+            return None
+        path = [dest]
+        while path[-1] != source :
+            path.append(parent[path[-1]])
+        path.reverse()
+        return path
+
+    def path(self, source, dest):
+        '''Path from source to dest (list of vertices), None if there is none'''
+        source, dest = int(source), int(dest)
+        if instrumentation.enabled :
+            instrumentation.count("hierarchy_queries")
+        if self.region[source] == self.region[dest]: #short range: no abstract search if the region is enough
+            path = self._local_path(source, dest)
+            if path != None :
+                return path
+        dist_source = self._local_bfs(source)[0]
+        dist_dest = self._local_bfs(dest)[0]
+        exits = {b: dist_dest[b] for b in self.nodes_of_region.get(self.region[dest], []) if b in dist_dest}
+        #A* on the abstract graph, the source is linked to the nodes of its region
+        #h: chebyshev distance to dest, a lower bound on the grids with 4 or 8 neighbours and cells 1 apart
+        x, y = self.coords.x_list, self.coords.y_list
+        h = lambda a : max(abs(x[a] - x[dest]), abs(y[a] - y[dest]))
+        best = {}
+        pred = {}
+        heap = []
+        for b in self.nodes_of_region.get(self.region[source], []):
+            if b in dist_source :
+                best[b] = dist_source[b]
+                pred[b] = None
+                heapq.heappush(heap, (dist_source[b] + h(b), dist_source[b], b))
+        best_total = math.inf
+        last = None
+        while len(heap) > 0 :
+            f, d, a = heapq.heappop(heap)
+            if d > best[a]:
+                continue
+            if f >= best_total :
+                break
+            if a in exits and d + exits[a] < best_total :
+                best_total = d + exits[a]
+                last = a
+            for b, w in self.abstract[a]:
+                if d + w < best.get(b, math.inf):
+                    best[b] = d + w
+                    pred[b] = a
+                    heapq.heappush(heap, (d + w + h(b), d + w, b))
+        if last == None : #the regions don't give a route (e.g. no entrance reached): search the flat graph
+            return distances.get_oracle(self.G_M).path(source, dest)
+        abstract_path = [last]
+        while pred[abstract_path[-1]] != None :
+            abstract_path.append(pred[abstract_path[-1]])
+        abstract_path.reverse()
+        #refinement: one BFS inside a region for each step of the abstract path
+        path = self._local_path(source, abstract_path[0])
+        for a, b in zip(abstract_path, abstract_path[1:]):
+            if self.region[a] != self.region[b]:
+                path.append(b)
+            else :
+                path += self._local_path(a, b)[1:]
+        path += self._local_path(abstract_path[-1], dest)[1:]
+        return path
+
+
+_hierarchies = {}
+
+def get_hierarchy(G_M):
+    '''Hierarchy of G_M, built at the first call and shared by every later call on the same graph object
+    (the graph must not be modified afterwards)'''
+    key = id(G_M)
+    if not(key in _hierarchies):
+        weakref.finalize(G_M, _hierarchies.pop, key, None)
+        _hierarchies[key] = HierarchicalPaths(G_M)
+    return _hierarchies[key]
@@ -0,0 +1,69 @@
+import math
+import igraph
+import numpy as np
+import heuristics
+
+#Instances generation: connected configurations of agents, and synthetic uniform grid graphs
+#(same attributes as the *_phys_uniform_grid_* / *_comm_uniform_grid_* graphml files)
+
+
+def choose_config(G_C, first_vertex, nb_agent):
+    '''Connected configuration: the agents are added one by one on a neighbour of the previous ones
+    Input: communication graph, vertex of the first agent, number of agents to add after it
+    Output: configuration (list of vertices)'''
+    config = [first_vertex]
+    neighbours = G_C.neighbors(config[0])
+    for n in range(nb_agent):
+        config.append(np.random.choice(neighbours,1)[0])
+        for i in G_C.neighbors(config[-1]):
+            if not(i in neighbours):
+                neighbours.append(i)
+    return config
+
+
+def far_vertex(G_M, vertex, nb_find = 20):
+    '''Among nb_find random vertices, the farthest from vertex (vertex itself if they are all on it)'''
+    candidates = np.random.randint(0,G_M.vcount(),nb_find)
+    dists = heuristics.get_coordinates(G_M).heuristic(vertex, candidates)
+    if dists.max()>0:
+        return candidates[np.argmax(dists)]
+    return vertex
+
+
+def random_instance(G_M, G_C, nb_agent):
+    '''Connected sources around a random vertex, connected targets around a far vertex (uses np.random, seed it before)
+    Output: sources, targets (lists of nb_agent vertices)'''
+    sources = choose_config(G_C, np.random.randint(0,G_M.vcount(),1)[0], nb_agent-1)
+    targets = choose_config(G_C, far_vertex(G_M, sources[0]), nb_agent-1)
+    return [int(v) for v in sources], [int(v) for v in targets]
+
+
+def grid_graphs(width, height, radius):
+    '''Synthetic uniform grid without obstacles: G_M links the 4 neighbouring cells, G_C the cells at distance <= radius
+    Output: G_M, G_C'''
+    nb_vertices = width*height
+    x_coord = [x + 0.5 for y in range(height) for x in range(width)]
+    y_coord = [y + 0.5 for y in range(height) for x in range(width)]
+    moves = []
+    for y in range(height):
+        for x in range(width):
+            v = y*width + x
+            if x+1 < width :
+                moves.append((v, v+1))
+            if y+1 < height :
+                moves.append((v, v+width))
+    r = int(math.floor(radius))
+    offsets = [(dx, dy) for dx in range(-r, r+1) for dy in range(0, r+1)
+               if (dy > 0 or dx > 0) and dx*dx + dy*dy <= radius*radius]
+    links = []
+    for y in range(height):
+        for x in range(width):
+            for dx, dy in offsets :
+                if 0 <= x+dx < width and y+dy < height :
+                    links.append((y*width + x, (y+dy)*width + x+dx))
+    G_M = igraph.Graph(n = nb_vertices, edges = moves)
+    G_C = igraph.Graph(n = nb_vertices, edges = links)
+    for G in (G_M, G_C):
+        G.vs["x_coord"] = x_coord
+        G.vs["y_coord"] = y_coord
+    return G_M, G_C
@@ -0,0 +1,72 @@
+import contextlib
+import logging
+import time
+
+#Counters and timers updated by the solvers (A* calls and expansions, nb_conflicts evaluations, is_connected checks,
+#recursion depth, time per phase). Everything is off by default: the solvers test `instrumentation.enabled` before
+#updating anything, so a disabled layer costs one attribute lookup
+#Usage: instrumentation.enable(); mapfalgo.mapf_algo(...); print(instrumentation.report()) or instrumentation.log_report()
+
+enabled = False
+counters = {} #name -> number of events
+maxima = {} #name -> largest value seen (e.g. recursion depth)
+timers = {} #name -> [total time in seconds, number of calls]
+
+logger = logging.getLogger("instrumentation")
+
+
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    counters.clear()
+    maxima.clear()
+    timers.clear()
+
+
+def count(name, n = 1):
+    counters[name] = counters.get(name, 0) + n
+
+def record_max(name, value):
+    if value > maxima.get(name, value-1):
+        maxima[name] = value
+
+
+@contextlib.contextmanager
+def _timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer = timers.setdefault(name, [0.0, 0])
+        timer[0] += time.perf_counter() - start
+        timer[1] += 1
+
+_not_timed = contextlib.nullcontext()
+
+def phase(name):
+    '''Context manager adding the time spent inside it to the timer name (does nothing if disabled)'''
+    if enabled :
+        return _timed(name)
+    return _not_timed
+
+
+def report():
+    '''Output: dict {"counters": {...}, "maxima": {...}, "timers": {name: {"time": s, "calls": n}}}'''
+    return {"counters": dict(counters),
+            "maxima": dict(maxima),
+            "timers": {name: {"time": t, "calls": n} for name, (t, n) in timers.items()}}
+
+def log_report(level = logging.INFO):
+    '''Emit the report through logging (one line per measure)'''
+    for name, value in sorted(counters.items()):
+        logger.log(level, "%s = %d", name, value)
+    for name, value in sorted(maxima.items()):
+        logger.log(level, "max %s = %s", name, value)
+    for name, (t, n) in sorted(timers.items()):
+        logger.log(level, "%s: %.6f s in %d calls", name, t, n)
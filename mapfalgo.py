@@ -1,20 +1,37 @@
 #from pysat.solvers import Solver
 import numpy as np
-import math
+import collections
+import weakref
+import logging
+import time
 import igraph
-from copy import deepcopy
 import heapq
 from numpy import random
-import priorityqueue
+import distances
+import connectivity
+import execution
+import graphstore
+import heuristics
+import instrumentation
+import segments
 
 
 nb_recursion = 10
 nb_attemps = 5
+nb_candidates = 10 #number of neighbours u tried by execution_with_best_neighbour, None to try all of them
+astar_heuristic = "chebyshev" #metric of the A* heuristic (see heuristics.Coordinates.heuristic), chebyshev for 8-connected grids
+path_cache_vertices = 4 * 2**20 #total length of the paths kept by get_path for each movement graph, ~36 bytes per vertex (the cache is emptied when it is full)
+use_distance_oracle = True #shortest paths are read from distances.DistanceOracle instead of running A* each time
+bb_max_nodes = 20000 #budget of the branch and bound of recursive_func (number of placements tried), None for no limit
+bb_time_budget = None #time budget of one branch and bound in seconds, None for no limit
+split_strategy = "middle" #time chosen by pick_time_with_conflict: "middle", "largest_component" or "most_disconnected"
+
+logger = logging.getLogger("mapfalgo")
 
 #G_M is the graph of movement & G_C of connection
 #sources:list 
 #targets:list (agent a goes from sources[a] to targets[a])
-#exec: list of paths for each agent
+#exec: paths for each agent (execution.Execution, exec[a] is the path of agent a)
 
 
 def decoupled_exec(G_M, sources, targets) :
@@ -22,26 +39,62 @@ def decoupled_exec(G_M, sources, targets) :
     Output: execution (paths) or None if an agent has no path'''
     paths = []
     for a in range(0, len(sources)) :
-       #pred_a = get_pred(G_M, sources[a], targets[a])
-       pred_a = get_pred_Astar(G_M, sources[a], targets[a])
-       if pred_a == None :
+       path_a = get_path(G_M, sources[a], targets[a])
+       if path_a == None :
            return None
        else :
-           paths.append(extract_path_from_pred(pred_a, sources[a], targets[a]))
-    max_t = max(map(len, paths))
-    for p in paths :
-        while len(p) < max_t :
-            p.append(p[len(p)-1]) #we want same-length paths for each agent, so we make them wait at their arrivals to complete their paths
-    return paths
+           paths.append(path_a)
+    return execution.Execution.from_paths(paths) #we want same-length paths for each agent, so we make them wait at their arrivals to complete their paths
+
+_path_caches = {} #id of G_M -> {(source, dest): path}
+_path_cache_sizes = {} #id of G_M -> number of vertices in the paths of its cache
+
+def get_path(G_M, source, dest):
+    '''Shortest path from source to dest (from the distance oracle or A*), cached by (graph, source, dest)
+    Output: path (list of vertices, shared by the callers: don't modify it), None if there is no path'''
+    key = id(G_M)
+    if not(key in _path_caches):
+        weakref.finalize(G_M, _path_caches.pop, key, None)
+        weakref.finalize(G_M, _path_cache_sizes.pop, key, None)
+        _path_caches[key] = {}
+        _path_cache_sizes[key] = 0
+    cache = _path_caches[key]
+    source, dest = int(source), int(dest)
+    if instrumentation.enabled :
+        instrumentation.count("path_queries")
+    if (source, dest) in cache :
+        if instrumentation.enabled :
+            instrumentation.count("path_cache_hits")
+        return cache[(source, dest)]
+    if use_distance_oracle :
+        path = distances.get_oracle(G_M).path(source, dest)
+    else :
+        #pred = get_pred(G_M, source, dest)
+        pred = get_pred_Astar(G_M, source, dest)
+        path = None if pred == None else extract_path_from_pred(pred, source, dest)
+    size = 1 if path == None else len(path)
+    if _path_cache_sizes[key] + size > path_cache_vertices :
+        cache.clear()
+        _path_cache_sizes[key] = 0
+    cache[(source, dest)] = path
+    _path_cache_sizes[key] += size
+    return path
 
 def extract_path_from_pred(pred, source, dest) :
-    '''Get a path from the predecessor's array
+    '''Get a path from the predecessor's array (iterative: the length is counted first, then the path is written from the end)
     Input: pred array, source and destination vertices
     Output: path (list of vertices) '''
-    if source == dest :
-        return [source]
-    else :
-        return extract_path_from_pred(pred, source, pred[dest])+ [dest]
+    length = 1
+    x = dest
+    while x != source :
+        x = pred[x]
+        length += 1
+    path = [source]*length
+    x = dest
+    for k in range(length-1, 0, -1):
+        path[k] = x
+        x = pred[x]
+    return path
 
 
 def get_pred(G_M, source, dest) :
@@ -64,66 +117,74 @@ def get_pred(G_M, source, dest) :
     return None
 
 #A* path finding
+#The open set is a plain heapq with lazy deletion: an improved vertex is pushed again and its outdated entries are skipped.
+#In pure python it is faster than the indexed heap of priorityqueue.py (see the benchmark at the end of that file)
 
 def get_pred_Astar(G_M, source, dest):
     ''' A* algorithm with the heuristic 'shortest distance between the vertice and the destination'
     Input: movement graph, source, destination
     Output: array of predecessors, None if there is no path between source and dest '''
+    if use_distance_oracle :
+        return distances.get_oracle(G_M).pred(source, dest)
+    if instrumentation.enabled :
+        instrumentation.count("astar_calls")
     pred = [-1 for x in range(G_M.vcount())]
     d = [-1 for x in range(G_M.vcount())]
     d[source]=0
-    heap = priorityqueue.PriorityQueue(G_M.vcount())
-    heap.push(source, get_distance(G_M, dest, source))
+    h = heuristics.get_coordinates(G_M).heuristic(dest, metric = astar_heuristic).tolist() #h of every vertex, computed at once
+    heap = [(h[source], source)]
     visited = [False for x in range(G_M.vcount())]
-    while not(heap.is_empty()) :
-        x = heap.pop()
+    nb_expansions = 0
+    while len(heap) > 0 :
+        x = heapq.heappop(heap)[1]
+        if visited[x] : #outdated entry
+            continue
         visited[x] = True
+        nb_expansions += 1
         if x == dest :
+            if instrumentation.enabled :
+                instrumentation.count("astar_expansions", nb_expansions)
             return pred
         neighbours = G_M.neighbors(x)
         for n in neighbours :
-            if not(visited[n]) or d[n] > d[x] +1:
+            if not(visited[n]) and (d[n] == -1 or d[n] > d[x] +1):
                 d[n] = d[x] + 1
-                heap.decrease(n, get_distance(G_M, dest, n)+d[n])
+                heapq.heappush(heap, (h[n]+d[n], n))
                 pred[n] = x
+    if instrumentation.enabled :
+        instrumentation.count("astar_expansions", nb_expansions)
     return None
 
 def get_distance(G_M, goal, agent):
     ''' Compute the distance between the position of the agent and the goal'''
-    xsource, ysource = G_M.vs[goal]["x_coord"], G_M.vs[goal]["y_coord"]
-    xagent, yagent = G_M.vs[agent]["x_coord"], G_M.vs[agent]["y_coord"]
-    return math.sqrt((xagent-xsource)**2 + (yagent-ysource)**2)
+    return heuristics.get_coordinates(G_M).distance(goal, agent)
 
 
 # Usefull functions
 
-def nb_conflicts(exec, G_C) :
+def nb_conflicts(exec, G_C, return_times = False) :
     '''Compute the number of connection conflicts found in the execution, by computing the number of configurations disconnected
-    Input: execution exec(not None), communication graph G_C
-    Output: int number of conflicts'''
-    list_config = [[0 for i_a in range(len(exec))] for t in range(len(exec[0]))]
-    for i_a in range(len(exec)) :
-        for t in range(len(exec[i_a])):
-            list_config[t][i_a] = exec[i_a][t]
-    is_connected_array = map(lambda config : is_connected(config, G_C), list_config)
-    return len(list(filter(lambda x : not x, is_connected_array)))
+    (all the timesteps are checked at once with connectivity.CommAdjacency)
+    Input: execution exec(not None), communication graph G_C, return_times to also get the conflicting timesteps
+    Output: int number of conflicts (and array of the times t with a conflict if return_times)'''
+    configs = np.asarray(exec).T
+    if instrumentation.enabled :
+        instrumentation.count("nb_conflicts_calls")
+        instrumentation.count("configurations_checked", len(configs))
+    connected = connectivity.get_adjacency(G_C).connected_configs(configs)
+    times = np.flatnonzero(~connected)
+    if return_times :
+        return len(times), times
+    return len(times)
     
 
 def is_connected(config, G_C):
     '''return True if the configuration is connected (it begins with a_0 and explores the neighbourhood. If an agent isn't visited, the configuration is disconnected)
     Input: configuration (list of position for each agent at time t), communication graph
     Output: boolean'''
-    queue = [0]
-    visited = [False for a in config]
-    visited[0] = True
-    while len(queue) > 0 :
-        x = queue.pop()
-        for i_a in range(0, len(config)):
-            if G_C.are_connected(config[x], config[i_a]) or config[x] == config[i_a]: #on ne gère pas les collisions
-                if not(visited[i_a]):
-                    queue.append(i_a)
-                    visited[i_a] = True
-    return all(visited)
+    if instrumentation.enabled :
+        instrumentation.count("is_connected_calls")
+    return bool(connectivity.get_adjacency(G_C).connected_configs([config])[0])
 
 
 
@@ -142,47 +203,132 @@ def is_ordered_connected(G_C, i, t, exec, middle):
 
 
 
-def pick_time_with_conflict(exec, G_C) : 
-    '''Choose t around the middle of the execution, with conflicts 
-    Input: exec, communication graph
-    Output: time t'''
+def conflict_profile(exec, G_C):
+    '''Connectivity of every configuration of the execution, computed in one pass
+    Input: execution, communication graph
+    Output: dict of arrays of length T: "conflict" (True if the configuration at t is disconnected),
+    "disconnected" (number of agents not connected to a_0), "largest" (size of the largest component without a_0)'''
+    configs = np.asarray(exec).T
+    if instrumentation.enabled :
+        instrumentation.count("configurations_checked", len(configs))
+    labels = connectivity.get_adjacency(G_C).components(configs)
+    nb_t, nb_a = labels.shape
+    sizes = np.zeros((nb_t, nb_a), dtype = np.int64) #sizes[t][c]: number of agents in the component c at t
+    np.add.at(sizes, (np.repeat(np.arange(nb_t), nb_a), labels.ravel()), 1)
+    disconnected = nb_a - sizes[:, 0]
+    sizes[:, 0] = 0
+    return {"conflict": disconnected > 0, "disconnected": disconnected, "largest": sizes.max(axis = 1, initial = 0)}
+
+
+def pick_time_with_conflict(exec, G_C, strategy = None) : 
+    '''Choose a time t with conflicts, according to the strategy (split_strategy if None):
+    "middle": the closest to the middle of the execution,
+    "largest_component": where the largest component cut from a_0 is the biggest,
+    "most_disconnected": where the most agents are cut from a_0
+    (ties are broken by the closeness to the middle)
+    Input: exec, communication graph, strategy
+    Output: time t (the middle if there is no conflict)'''
+    if strategy == None :
+        strategy = split_strategy
     max_len = max(map(len, exec))
-    for i in range(0,max_len//2):
-        if nb_conflicts([[exec_i[max_len//2 + i]] for exec_i in exec], G_C) > 0 :
-            return max_len//2 +i 
-        elif nb_conflicts([[exec_i[max_len//2 - i]] for exec_i in exec], G_C) > 0 :
-            return max_len//2 -i 
-    if nb_conflicts([[exec_i[0]] for exec_i in exec], G_C) > 0:
-        return 0
-    if max_len%2==1 :
-        if nb_conflicts([[exec_i[max_len-1]] for exec_i in exec], G_C) > 0:
-            return max_len-1
-    return max_len//2
+    middle = max_len//2
+    if strategy == "middle":
+        conflict = connectivity.get_adjacency(G_C).connected_configs(np.asarray(exec).T) == False
+        score = None
+    elif strategy == "largest_component" or strategy == "most_disconnected":
+        profile = conflict_profile(exec, G_C)
+        conflict = profile["conflict"]
+        score = profile["largest"] if strategy == "largest_component" else profile["disconnected"]
+    else :
+        raise ValueError("unknown split strategy: " + str(strategy))
+    times = np.flatnonzero(conflict)
+    if len(times) == 0 :
+        return middle
+    #closeness to the middle: middle+d before middle-d, except at d = middle where 0 comes before max_len-1
+    dist = np.abs(times - middle)
+    after_first = (times < middle) != (dist == middle)
+    if score is None :
+        order = np.lexsort((after_first, dist))
+    else :
+        order = np.lexsort((after_first, dist, -score[times]))
+    return int(times[order[0]])
 
 
 def choose_order(G_C, config) :
     '''Choose an order of agents, by choosing the first randomly and the next by BFS
     Input: communication graph, initial configuration of agents
-    Output: list of id '''
+    Output: list of id (None if the configuration is disconnected)'''
     i = np.random.randint(0, len(config), 1)[0]
-    A_ordered_id = [i]
-    #BFS on the initial configuration
-    queue = G_C.neighbors(config[i], mode = "all")
-    while len(A_ordered_id)<len(config) and len(queue)>0:
-        v = queue.pop(0)
-        for j in range(0, len(config)):
-            if config[j]==v and not(j in A_ordered_id):
-                A_ordered_id.append(j)
-                queue += G_C.neighbors(config[j], mode = "all")
-    if len(A_ordered_id)<len(config):
+    return agent_order(connectivity.get_adjacency(G_C).agent_neighbours(config), i)
+
+
+def choose_orders(G_C, config) :
+    '''Distinct orders for the attempts of mapf_algo, from one computation of the links between the agents:
+    BFS from a random first agent (the order of choose_order), then BFS from the other agents (in random order), then DFS from them.
+    The orders are generated when they are asked, so the random draws are only done for the attempts really made
+    Input: communication graph, initial configuration of agents
+    Output: generator of orders (nothing if the configuration is disconnected)'''
+    neighbours = connectivity.get_adjacency(G_C).agent_neighbours(config)
+    first = np.random.randint(0, len(config), 1)[0]
+    order = agent_order(neighbours, first)
+    if order == None :
+        return
+    seen = {tuple(order)}
+    yield order
+    others = [a for a in np.random.permutation(len(config)) if a != first]
+    for a, depth_first in [(a, False) for a in others] + [(a, True) for a in [first] + others]:
+        order = agent_order(neighbours, a, depth_first)
+        if not(tuple(order) in seen):
+            seen.add(tuple(order))
+            yield order
+
+
+def inverse_order(order):
+    '''The paths are computed in the order of the agents (path k is the one of agent order[k]): the rows
+    inverse_order(order) of this execution are the paths in the initial order of the agents (path a is the one of agent a)
+    Input: order of the agents (permutation of 0...A-1)
+    Output: list, the inverse permutation of order'''
+    inverse = [0 for a in range(len(order))]
+    for k in range(len(order)):
+        inverse[order[k]] = k
+    return inverse
+
+
+def agent_order(neighbours, first, depth_first = False):
+    '''Order of the agents in a BFS (or DFS) of the communication links, from the agent first
+    Input: neighbours[a] list of the agents communicating with a (see connectivity.CommAdjacency.agent_neighbours)
+    Output: list of id, None if some agents aren't reached'''
+    first = int(first)
+    visited = [False for a in range(len(neighbours))]
+    A_ordered_id = []
+    frontier = collections.deque([first])
+    if not(depth_first):
+        visited[first] = True
+        A_ordered_id.append(first)
+    while len(frontier) > 0 :
+        if depth_first :
+            a = frontier.pop()
+            if visited[a]:
+                continue
+            visited[a] = True
+            A_ordered_id.append(a)
+            frontier.extend(reversed(neighbours[a]))
+        else :
+            a = frontier.popleft()
+            for b in neighbours[a]:
+                if not(visited[b]):
+                    visited[b] = True
+                    A_ordered_id.append(b)
+                    frontier.append(b)
+    if len(A_ordered_id)<len(neighbours):
         return None
-    else :
-        return A_ordered_id
+    return A_ordered_id
 
 
 #do this with a priority queue
-def execution_with_best_neighbour(G_M, G_C, sources, targets, i, t, middle):
+def execution_with_best_neighbour(G_M, G_C, sources, targets, i, t, middle, deadline = None):
     '''Choose a neighbour u of a_0...a_i-1 which minimize d(u, g_i) and nb of conflicts 
+    (after the deadline, only the candidates already scored are compared)
     Output: execution with a_i going through u at t'''
     Neighbours = []
     inside = [False for x in range(G_M.vcount())]
@@ -199,164 +345,527 @@ def execution_with_best_neighbour(G_M, G_C, sources, targets, i, t, middle):
             inside[middle[j]]=True
     best = Neighbours[0]
     best_exec = decoupled_exec(G_M, sources, targets)
-    min_dist_u_goal = 2*len(best_exec[0])
     min_nb_conflicts = nb_conflicts(best_exec, G_C)
-    min_len_exec = 2*len(best_exec)
-    min_diff = 2*len(best_exec[0]) #t-min_dist_start_u
-    #for u in Neighbours:
-    for k in range(0,10):
-        u = np.random.choice(Neighbours, 1)[0]
-        exec_si_u = decoupled_exec(G_M, [sources[i]], [u])
-        exec_u_gi = decoupled_exec(G_M, [u], [targets[i]])
-        if exec_u_gi!= None and exec_si_u!= None:
-            dist_start_u = len(exec_si_u[0])
-            dist_u_gi = len(exec_u_gi[0])
-            exec_first = decoupled_exec(G_M, sources, middle+[u])
-            exec_second = decoupled_exec(G_M, middle+[u], targets)
-            if exec_first!= None and exec_second!= None :
-                exec_tested = concatanate_executions(exec_first,exec_second)
-                if nb_conflicts(exec_tested, G_C) <= min_nb_conflicts:
-                    if (np.abs(t-dist_start_u),dist_u_gi,len(exec_tested[0])) < (min_diff, min_dist_u_goal, min_len_exec):
-                    #conditions en plus : np.abs(t-dist_start_u) < min_diff, len(exec_tested[0])<=min_len_exec ?
-                        best = u
-                        min_dist_u_goal = dist_u_gi
-                        min_diff = np.abs(t-dist_start_u)
-                        min_nb_conflicts = nb_conflicts(exec_tested, G_C)
-                        best_exec = exec_tested
-                        min_len_exec=len(exec_tested[0])
-        #if there is one, then compute the distance d(u, g_i) and the nb of conflicts: 
-        #if it's less than min_dist then and min_nb_conflicts then replace best by u
+    if nb_candidates == None or nb_candidates >= len(Neighbours):
+        candidates = Neighbours
+    else :
+        candidates = np.random.choice(Neighbours, nb_candidates, replace = False)
+    #the best u minimizes (nb of conflicts, |t-d(s_i,u)|, d(u, g_i), length of the execution), u breaks the ties
+    for score, exec_tested in evaluate_candidates(G_M, G_C, sources, targets, i, t, middle, candidates, deadline):
+        if score[0] <= min_nb_conflicts :
+            return score[4], exec_tested
     return best, best_exec
 
+def evaluate_candidates(G_M, G_C, sources, targets, i, t, middle, candidates, deadline = None):
+    '''Score each candidate u of execution_with_best_neighbour. The paths of a_0...a_i-1 (sources -> middle -> targets)
+    are computed once for all the candidates, only the path of a_i through u changes
+    Output: list of (score, execution with a_i going through u), sorted by score
+    score = (nb of conflicts, |t-d(s_i,u)|, d(u, g_i), length of the execution, u)'''
+    if i > 0 :
+        first_common = decoupled_exec(G_M, sources[:i], middle[:i])
+        second_common = decoupled_exec(G_M, middle[:i], targets[:i])
+        if first_common == None or second_common == None :
+            return []
+        #components of a_0...a_i-1 at each time: the conflicts of a candidate only need the path of a_i
+        first_tracker = connectivity.ConflictTracker(first_common, G_C)
+        second_tracker = connectivity.ConflictTracker(second_common, G_C)
+    results = []
+    for u in candidates:
+        if deadline != None and time.perf_counter() >= deadline :
+            break
+        #the same (cached) paths as decoupled_exec, otherwise the middle found isn't the one solved next
+        path_si_u = get_path(G_M, sources[i], u)
+        path_u_gi = get_path(G_M, u, targets[i])
+        if path_u_gi!= None and path_si_u!= None:
+            if i > 0 :
+                exec_first = execution.add_agent(first_common, path_si_u)
+                exec_second = execution.add_agent(second_common, path_u_gi)
+            else :
+                exec_first = execution.Execution([path_si_u])
+                exec_second = execution.Execution([path_u_gi])
+            exec_tested = concatanate_executions(exec_first,exec_second)
+            if i > 0 : #the first time of the second part is the last one of the first part
+                conflicts = first_tracker.conflicts_with_agent(path_si_u)[0] + second_tracker.conflicts_with_agent(path_u_gi, 1)[0]
+            else :
+                conflicts = 0
+            score = (conflicts, abs(t-len(path_si_u)), len(path_u_gi), exec_tested.nb_timesteps, int(u))
+            results.append((score, exec_tested))
+    results.sort(key = lambda r : r[0])
+    return results
+
 def concatanate_executions(ex1, ex2):
     '''Input: 2 executions with same number of agents
     Output: the concatenation (in time) of the executions '''
-    ex_final = deepcopy(ex1)
-    for i_a in range(len(ex2)):
-        ex_final[i_a]+= ex2[i_a][1:]
-    return ex_final
+    return execution.concatenate(ex1, ex2)
 
 ###Algorithm (must return list of paths)
 
-def mapf_algo(G_Mname, G_Cname, sources, targets):
+def mapf_algo(G_Mname, G_Cname, sources, targets, memo = None):
     '''This algorithm's method is divide and conquer 
-    Input: graphs names, lists of sources and targets
+    Input: graphs names (or graphs already loaded), lists of sources and targets,
+    memo of the solved parts (segments.SegmentMemo, to share it between several calls on the same graphs)
     Output: execution '''
-    G_C = igraph.read(G_Cname)
-    G_M = igraph.read(G_Mname)
-    nb_it = 0
-    while nb_it < nb_attemps : #number of attempts to find a better P
-        #print("Attempt number ", nb_it+1)
-        A_ordered_id = choose_order(G_C, sources)
-        #print("Order of agents:", A_ordered_id) 
-        #We reorder the sources and targets
-        sources_ordered = [sources[i] for i in A_ordered_id]
-        targets_ordered = [targets[i] for i in A_ordered_id]
-        exec_changed = divide_and_conquer(sources_ordered, targets_ordered, G_C, G_M, nb_recursion) 
-        if exec_changed!= None and nb_conflicts(exec_changed, G_C) == 0:
-            return [exec_changed[A_ordered_id[i]] for i in range(len(sources))] #in the initial order
+    G_C = graphstore.as_graph(G_Cname)
+    G_M = graphstore.as_graph(G_Mname)
+    if memo == None :
+        memo = segments.SegmentMemo() #the parts solved by an attempt are reused by the next ones
+    new_orders = choose_orders(G_C, sources)
+    orders = [] #orders already tried
+    for nb_it in range(nb_attemps) : #number of attempts to find a better P
+        logger.debug("Attempt number %d", nb_it+1)
+        with instrumentation.phase("choose_order"):
+            order = next(new_orders, None)
+        if order == None : #no new order: the ones already tried are used again (the neighbours tried are random)
+            if len(orders) == 0 : #the agents can't be ordered
+                return None
+            order = orders[nb_it % len(orders)]
         else :
-            nb_it+=1
+            orders.append(order)
+        logger.debug("Order of agents: %s", order)
+        exec_changed = mapf_attempt(G_M, G_C, sources, targets, memo, order)
+        if exec_changed!= None :
+            return exec_changed
+    return None
+
+
+def mapf_algo_stream(G_Mname, G_Cname, sources, targets):
+    '''Streaming version of mapf_algo: generator of chunks of the execution (executions of some consecutive timesteps,
+    in the initial order of the agents), given as soon as the left parts of divide_and_conquer are solved.
+    Every chunk is connected. When a part has a conflict, the configurations before it are given and a new attempt starts
+    from the last configuration given. The chunks concatenated in time make the execution (a chunk doesn't repeat the last
+    configuration of the previous one). After nb_attemps failed attempts, or if an agent has no path, the generator stops:
+    the last configuration given is then not the targets
+    Input: graphs names (or graphs already loaded), lists of sources and targets
+    Output: generator of executions'''
+    G_C = graphstore.as_graph(G_Cname)
+    G_M = graphstore.as_graph(G_Mname)
+    memo = segments.SegmentMemo()
+    current = [int(v) for v in sources] #last configuration given
+    first_chunk = True
+    nb_failures = 0
+    while nb_failures < nb_attemps :
+        A_ordered_id = choose_order(G_C, current)
+        if A_ordered_id == None :
+            return
+        initial_order = inverse_order(A_ordered_id)
+        sources_ordered = [current[i] for i in A_ordered_id]
+        targets_ordered = [targets[i] for i in A_ordered_id]
+        parts = divide_and_conquer_parts(sources_ordered, targets_ordered, G_C, G_M, nb_recursion, None, memo)
+        failed = False
+        for part in parts :
+            if part == None : #no path
+                return
+            part = part[initial_order]
+            if not(first_chunk):
+                part = part.time_slice(1)
+            if part.nb_timesteps == 0 :
+                continue
+            nb, times = nb_conflicts(part, G_C, return_times = True)
+            if nb > 0 :
+                part = part.time_slice(0, times[0]) #connected configurations before the conflict
+                failed = True
+            if part.nb_timesteps > 0 :
+                yield part
+                current = [int(v) for v in part.config(part.nb_timesteps-1)]
+                first_chunk = False
+            if failed :
+                break
+        parts.close()
+        if not(failed):
+            return
+        nb_failures += 1
+        logger.debug("Streaming: conflict, new attempt from %s", current)
+
+
+def mapf_attempt(G_M, G_C, sources, targets, memo = None, order = None):
+    '''One attempt of mapf_algo: order of the agents (random with choose_order if None), then divide and conquer
+    Input: graphs, lists of sources and targets, memo of the solved parts (segments.SegmentMemo) shared by the attempts, order
+    Output: connected execution in the initial order of the agents, None if the attempt failed'''
+    exec_changed = ordered_attempt(G_M, G_C, sources, targets, memo = memo, order = order)
+    if exec_changed!= None and nb_conflicts(exec_changed, G_C) == 0:
+        return exec_changed
     return None
 
 
-def divide_and_conquer(sources, targets, G_C, G_M, n):
+def ordered_attempt(G_M, G_C, sources, targets, deadline = None, memo = None, order = None):
+    '''Order of the agents (random with choose_order if None), then divide and conquer (abandoned at the deadline)
+    Input: graphs, lists of sources and targets, deadline (time.perf_counter() value, None for no deadline)
+    Output: execution in the initial order of the agents, possibly with conflicts, None if the agents can't be ordered or if
+    the deadline passed before the end'''
+    if instrumentation.enabled :
+        instrumentation.count("attempts")
+    A_ordered_id = order
+    if A_ordered_id == None :
+        with instrumentation.phase("choose_order"):
+            A_ordered_id = choose_order(G_C, sources)
+    logger.debug("Order of agents: %s", A_ordered_id)
+    if A_ordered_id == None :
+        return None
+    #We reorder the sources and targets
+    sources_ordered = [sources[i] for i in A_ordered_id]
+    targets_ordered = [targets[i] for i in A_ordered_id]
+    exec_changed = divide_and_conquer(sources_ordered, targets_ordered, G_C, G_M, nb_recursion, deadline, memo) 
+    if exec_changed == None :
+        return None
+    return exec_changed[inverse_order(A_ordered_id)] #in the initial order (indexing with A_ordered_id itself is only right when the order is its own inverse)
+
+
+def mapf_algo_anytime(G_Mname, G_Cname, sources, targets, time_budget, stop_at_first = True):
+    '''Anytime version of mapf_algo: attempts are run until the time budget is spent, and the best execution found so far
+    (fewest connection conflicts, then shortest) is returned. The decoupled execution is the first "best so far"
+    Input: graphs names (or graphs already loaded), lists of sources and targets, time budget in seconds,
+    stop_at_first to return as soon as an execution without conflict is found (otherwise shorter ones are searched until the deadline)
+    Output: execution (None if an agent has no path), dict {"conflicts", "makespan", "attempts", "elapsed", "connected"}
+    If the agents can't be ordered (sources disconnected), the decoupled execution is returned at once'''
+    start = time.perf_counter()
+    deadline = start + time_budget
+    G_C = graphstore.as_graph(G_Cname)
+    G_M = graphstore.as_graph(G_Mname)
+    best = decoupled_exec(G_M, sources, targets)
+    if best == None :
+        return None, {"conflicts": None, "makespan": None, "attempts": 0, "elapsed": time.perf_counter()-start, "connected": False}
+    best_quality = (nb_conflicts(best, G_C), best.nb_timesteps)
+    memo = segments.SegmentMemo()
+    new_orders = choose_orders(G_C, sources) #as in mapf_algo: distinct orders first, then the ones already tried again
+    orders = []
+    nb_it = 0
+    last_duration = 0 #time taken by the last attempt: an attempt isn't started if less time than that remains
+    while deadline - time.perf_counter() > last_duration and not(stop_at_first and best_quality[0] == 0):
+        attempt_start = time.perf_counter()
+        order = next(new_orders, None)
+        if order == None :
+            if len(orders) == 0 : #the agents can't be ordered: no attempt can improve the decoupled execution
+                break
+            order = orders[nb_it % len(orders)]
+        else :
+            orders.append(order)
+        nb_it += 1
+        exec_changed = ordered_attempt(G_M, G_C, sources, targets, deadline, memo, order)
+        last_duration = time.perf_counter() - attempt_start
+        if exec_changed != None :
+            quality = (nb_conflicts(exec_changed, G_C), exec_changed.nb_timesteps)
+            if quality < best_quality :
+                best, best_quality = exec_changed, quality
+                logger.debug("Attempt %d: %d conflicts, makespan %d", nb_it, quality[0], quality[1])
+    return best, {"conflicts": best_quality[0], "makespan": best_quality[1], "attempts": nb_it,
+                  "elapsed": time.perf_counter()-start, "connected": best_quality[0] == 0}
+
+
+def divide_and_conquer(sources, targets, G_C, G_M, n, deadline = None, memo = None):
     '''This function fixes the connection problem around the middle of the execution, then does it again for each part
-    Stops after 10 iterations'''
-    exec = decoupled_exec(G_M, sources, targets)
+    Stops after 10 iterations. When the deadline (time.perf_counter() value) is passed, the attempt is abandoned and None is returned
+    The parts are handled with an explicit stack (left part first), so n isn't limited by the recursion limit of Python.
+    The connected parts are kept in memo (segments.SegmentMemo) and reused when the same part comes again'''
+    parts = divide_and_conquer_parts(sources, targets, G_C, G_M, n, deadline, memo)
+    try:
+        while True :
+            next(parts)
+    except StopIteration as end:
+        return end.value
+
+
+def divide_and_conquer_parts(sources, targets, G_C, G_M, n, deadline = None, memo = None):
+    '''Generator version of divide_and_conquer: the final parts (not split anymore) are given from left to right as soon as
+    they are solved, the right parts aren't computed yet. Two consecutive parts share a configuration
+    (the last one of the first, the first one of the second). A part is None if an agent has no path
+    Output (value of StopIteration): execution of the whole segment, None if the deadline passed before the end'''
+    if memo == None :
+        memo = segments.SegmentMemo()
+    results = [] #executions of the parts already solved
+    stack = [("solve", sources, targets, n)]
+    while len(stack) > 0 :
+        if deadline != None and time.perf_counter() >= deadline :
+            return None
+        task = stack.pop()
+        if task[0] == "combine":
+            _, sources_part, targets_part = task
+            L2 = results.pop()
+            L1 = results.pop()
+            if L1 == None or L2 == None :
+                results.append(None)
+                continue
+            exec = concatanate_executions(L1, L2)
+            if nb_conflicts(exec, G_C) == 0 :
+                memo.add(sources_part, targets_part, exec)
+            results.append(exec)
+            continue
+        _, sources_part, targets_part, n_part = task
+        exec = memo.get(sources_part, targets_part)
+        if exec != None :
+            if instrumentation.enabled :
+                instrumentation.count("segment_memo_hits")
+            results.append(exec)
+            yield exec
+            continue
+        middle = split_segment(sources_part, targets_part, G_C, G_M, n_part, deadline)
+        if not(isinstance(middle, list)): #the part is solved (or can't be split)
+            results.append(middle)
+            yield middle
+            continue
+        stack.append(("combine", sources_part, targets_part))
+        stack.append(("solve", middle, targets_part, n_part-1))
+        stack.append(("solve", sources_part, middle, n_part-1))
+    return results[0]
+
+
+def split_segment(sources, targets, G_C, G_M, n, deadline = None):
+    '''One step of divide_and_conquer: computes the decoupled execution of the part and, if it has conflicts and splits are
+    still allowed, a new configuration (middle) around a time with conflict, connected as much as possible
+    Output: middle (list of vertices) if the part must be split, otherwise the execution of the part (None if there is no path)'''
+    if instrumentation.enabled :
+        instrumentation.count("divide_and_conquer_calls")
+        instrumentation.record_max("recursion_depth", nb_recursion-n)
+    with instrumentation.phase("decoupled_exec"):
+        exec = decoupled_exec(G_M, sources, targets)
     if exec == None or len(exec)==1:
         return exec
-    #print("Call number ", nb_recursion+1-n, ":", exec)
+    #logger.debug("Call number %d: %s", nb_recursion+1-n, exec)
     if nb_conflicts(exec, G_C) == 0 :
-        #print("No conflict at call ", nb_recursion+1-n)
+        #logger.debug("No conflict at call %d", nb_recursion+1-n)
         return exec
-    if n >0: #number of recursive calls = 10
-        #print("nb conflicts = ", nb_conflicts(exec, G_C))
-        t = pick_time_with_conflict(exec, G_C)
-        #print(t)
+    if n >0 and (deadline == None or time.perf_counter() < deadline): #number of recursive calls = 10
+        #logger.debug("nb conflicts = %d", nb_conflicts(exec, G_C))
+        with instrumentation.phase("pick_time_with_conflict"):
+            t = pick_time_with_conflict(exec, G_C)
+        #logger.debug("time %d", t)
         middle = [] #the new configuration at t
+        prefix = connectivity.ConflictTracker(exec[:0], G_C, exec.nb_timesteps) #conflicts of exec[:i+1], one agent added at each step
         for i in range(len(sources)):
+            if deadline != None and time.perf_counter() >= deadline : #the part is left decoupled (divide_and_conquer stops)
+                return exec
+            prefix.add_agent(exec[i])
             if is_ordered_connected(G_C, i, t, exec, middle) :
                 middle.append(exec[i][t])
             else:
-                u, exec_changed = execution_with_best_neighbour(G_M,G_C, sources[:i+1], targets[:i+1], i, t, middle) #update of exec_i
-                if nb_conflicts(exec_changed, G_C) < nb_conflicts(exec[:i+1], G_C):
+                with instrumentation.phase("execution_with_best_neighbour"):
+                    u, exec_changed = execution_with_best_neighbour(G_M,G_C, sources[:i+1], targets[:i+1], i, t, middle, deadline) #update of exec_i
+                if nb_conflicts(exec_changed, G_C) < prefix.nb_conflicts():
                     middle.append(u)
                 else :
                     middle.append(exec[i][t])
-        L1 =  divide_and_conquer(sources, middle, G_C, G_M, n-1) 
-        L2 = divide_and_conquer(middle, targets, G_C, G_M, n-1)
-        return concatanate_executions(L1, L2)
+        return middle
     else :
         return exec
 
 
 ###Algorithm : 2nd version 
 
-def randomly_choose(start, goal, G_M, t):
-    return random.randint(0, G_M.vcount(), 1)[0] #todo
+class Reachability:
+    '''Positions each agent can have at time t: d(s_a, v) <= t and d(v, g_a) <= horizon - t, from the BFS trees of the distance
+    oracle (one from each source, one toward each target). horizon is by default the length of the decoupled execution
+    (max of the d(s_a, g_a)). An agent without such position (t too small or too large) can be on the vertices with the
+    smallest delay'''
+
+    def __init__(self, G_M, sources, targets, t, horizon = None):
+        oracle = distances.get_oracle(G_M)
+        self.dist_from = [oracle.distances_from(s).astype(np.int64) for s in sources]
+        self.dist_to = [oracle.distances_to(g).astype(np.int64) for g in targets]
+        if horizon == None :
+            horizon = max(int(self.dist_from[a][targets[a]]) for a in range(len(sources)))
+        self.t = t
+        self.horizon = horizon
+        self.costs = [] #[a][v] = d(s_a, v) + d(v, g_a), -1 if a can't go through v
+        self.positions = [] #[a] array of the vertices where a can be at t
+        for a in range(len(sources)):
+            reachable = (self.dist_from[a] >= 0) & (self.dist_to[a] >= 0)
+            self.costs.append(np.where(reachable, self.dist_from[a] + self.dist_to[a], -1))
+            delay = np.maximum(self.dist_from[a] - t, self.dist_to[a] - (horizon - t))
+            delay[~reachable] = np.iinfo(np.int64).max
+            best = delay.min()
+            self.positions.append(np.flatnonzero(delay <= max(best, 0)))
+
+    def sample(self, a):
+        '''Random position of a at time t'''
+        return int(self.positions[a][random.randint(0, len(self.positions[a]))])
+
+
+def randomly_choose(start, goal, G_M, t, horizon = None):
+    '''Random vertex where an agent going from start to goal can be at time t (see Reachability)'''
+    return Reachability(G_M, [start], [goal], t, horizon).sample(0)
+
+def score_vertices(reach, G_C, i, list_v_agents, vertices):
+    '''Score of the vertices v for a_i (a_0...a_i-1 on list_v_agents): (lengths of the paths s_i -> v -> g_i, conflict, v),
+    conflict is 1 if the configuration is disconnected when the agents after a_i are on positions sampled from reach
+    (the same sample for every v, so the configurations are checked at once)'''
+    vertices = np.asarray(vertices, dtype = np.int64)
+    random_agents = [reach.sample(j) for j in range(i+1, len(reach.positions))]
+    configs = np.empty((len(vertices), len(reach.positions)), dtype = np.int64)
+    configs[:, :i] = list_v_agents
+    configs[:, i] = vertices
+    configs[:, i+1:] = random_agents
+    conflicts = ~connectivity.get_adjacency(G_C).connected_configs(configs)
+    dists = reach.costs[i][vertices] + 2
+    return [(int(dists[k]), int(conflicts[k]), int(vertices[k])) for k in range(len(vertices))]
+
+def heuristic_compute(sources, targets, G_M, G_C, v, t, i, list_v_agents, reach = None):
+    '''Score of v for a_i (see score_vertices), reach: Reachability of the agents at t (built if None)'''
+    if reach == None :
+        reach = Reachability(G_M, sources, targets, t)
+    return score_vertices(reach, G_C, i, list_v_agents, [v])[0]
+
+
+def search_vertices(sources, targets, t, G_M, G_C, list_v_agents, reach = None):
+    '''Vertices where a_i can go (next to a_0...a_i-1 if i > 0), in a heap ordered by score (see score_vertices)'''
+    if reach == None :
+        reach = Reachability(G_M, sources, targets, t)
+    i = len(list_v_agents)
+    allowed = reach.costs[i] >= 0 #a_i can go through v
+    if len(list_v_agents) >0 :
+        allowed &= connectivity.get_adjacency(G_C).neighbourhood(list_v_agents)
+    list_vertices = score_vertices(reach, G_C, i, list_v_agents, np.flatnonzero(allowed))
+    heapq.heapify(list_vertices)
+    return list_vertices
 
-def heuristic_compute(sources, targets, G_M, G_C, v, t, i, list_v_agents):
-    random_agents = []
-    for j in range(i+1, len(sources)):
-        random_agents.append(randomly_choose(sources[j], targets[j], G_M, t))
-    conflict = nb_conflicts([list_v_agents+[v]+random_agents], G_C)
-    dist = len(decoupled_exec(G_M, [sources[i]], [v])[0]) + len(decoupled_exec(G_M, [v], [targets[i]])[0]) 
-    '''dist = get_distance(G_M, v, sources[i])+ get_distance(G_M, targets[i], v) #todo
-    for n in range(len(list_v_agents)):
-        dist+= get_distance(G_M, list_v_agents[n], sources[n])+ get_distance(G_M, targets[n], list_v_agents[n])#todo'''
-    return (dist, - conflict, v)
+class MiddleSearch:
+    '''Branch and bound on the middle configuration of best_choice, as an IDA* (depth first searches with an increasing bound).
+    The agents are placed one by one, each on a vertex communicating with the vertices of the agents before it.
+    Cost of an assignment: sum of d(s_a, v_a) + d(v_a, g_a). Lower bound of a partial one: its cost + d(s_a, g_a) for the others.
+    A placement is pruned as soon as the paths s_i -> v -> g_i lose contact with all the agents before it (apart from the first
+    and the last configurations, which are the sources and the targets): an agent never isolated from the previous ones keeps
+    the configurations connected. The partial assignments whose subtree was explored without solution are memoized,
+    the next iterations skip them'''
+
+    def __init__(self, sources, targets, G_C, G_M, t, max_nodes = None, time_budget = None):
+        self.G_M = G_M
+        self.G_C = G_C
+        self.sources = sources
+        self.targets = targets
+        self.adjacency = connectivity.get_adjacency(G_C)
+        self.reach = Reachability(G_M, sources, targets, t)
+        self.cost_tables = list(self.reach.costs) #[a][v] = d(s_a, v) + d(v, g_a), -1 if a can't go through v
+        shortest = [int(self.cost_tables[a][sources[a]]) for a in range(len(sources))]
+        self.feasible = not(-1 in shortest)
+        self.remaining = [sum(shortest[a:]) for a in range(len(sources)+1)] #lower bound of the agents a, a+1...
+        self.failed = set()
+        self.max_nodes = max_nodes
+        self.deadline = None if time_budget == None else time.perf_counter() + time_budget
+        self.nb_nodes = 0
+        self.exhausted = False
+
+    def run(self):
+        '''Output: middle configuration (list) with the smallest cost, None if there is none or if the budget is spent'''
+        if not(self.feasible):
+            return None
+        bound = self.remaining[0]
+        while bound != float("inf") and not(self.exhausted):
+            self.next_bound = float("inf")
+            res = self._search([], [], [], 0, bound)
+            if res != None :
+                return res
+            bound = self.next_bound
+        return None
 
+    def _out_of_budget(self):
+        if self.max_nodes != None and self.nb_nodes >= self.max_nodes :
+            return True
+        return self.deadline != None and time.perf_counter() > self.deadline
+
+    def _candidates(self, partial):
+        '''Vertices where the next agent can be placed, by increasing cost, then connected before disconnected
+        (with the next agents on sampled positions, see score_vertices), then by vertex'''
+        table = self.cost_tables[len(partial)]
+        allowed = table >= 0
+        if len(partial) > 0 :
+            allowed &= self.adjacency.neighbourhood(partial)
+        candidates = np.flatnonzero(allowed)
+        scores = score_vertices(self.reach, self.G_C, len(partial), partial, candidates)
+        conflicts = np.array([score[1] for score in scores], dtype = np.int64)
+        return candidates[np.lexsort((candidates, conflicts, table[candidates]))]
+
+    def _in_contact(self, prefix, path, first, last):
+        '''True if the agent following path communicates with an agent of prefix (array agents x time) at every time,
+        except the first one if first is False and the last one if last is False'''
+        nb_timesteps = max(prefix.shape[1], len(path))
+        row = np.empty(nb_timesteps, dtype = np.int64)
+        row[:len(path)] = path
+        row[len(path):] = path[len(path)-1]
+        times = np.minimum(np.arange(nb_timesteps), prefix.shape[1]-1)
+        contact = self.adjacency.adjacent_to(row, prefix[:, times].T).any(axis = 1)
+        return bool(contact[0 if first else 1 : nb_timesteps if last else nb_timesteps-1].all())
+
+    def _search(self, partial, first_paths, second_paths, cost, bound):
+        i = len(partial)
+        if i == len(self.sources):
+            return partial
+        if tuple(partial) in self.failed :
+            return None
+        explored = True #False if a part of the subtree was cut by the bound
+        if i > 0 :
+            first_prefix = execution.Execution.from_paths(first_paths).array
+            second_prefix = execution.Execution.from_paths(second_paths).array
+        table = self.cost_tables[i]
+        for v in self._candidates(partial):
+            v = int(v)
+            estimate = cost + int(table[v]) + self.remaining[i+1]
+            if estimate > bound : #the next candidates cost even more
+                self.next_bound = min(self.next_bound, estimate)
+                explored = False
+                break
+            if self._out_of_budget():
+                self.exhausted = True
+                return None
+            self.nb_nodes += 1
+            path_first = get_path(self.G_M, self.sources[i], v)
+            path_second = get_path(self.G_M, v, self.targets[i])
+            if i > 0 and not(self._in_contact(first_prefix, path_first, False, True)
+                             and self._in_contact(second_prefix, path_second, True, False)):
+                continue
+            res = self._search(partial+[v], first_paths+[path_first], second_paths+[path_second], cost + int(table[v]), bound)
+            if res != None :
+                return res
+            if self.exhausted :
+                return None
+            if i+1 < len(self.sources) and not(tuple(partial+[v]) in self.failed):
+                explored = False
+        if explored :
+            self.failed.add(tuple(partial))
+        return None
 
-def search_vertices(sources, targets, t, G_M, G_C, list_v_agents):
-    list_vertices = []
-    heapq.heapify(list_vertices)
-    if len(list_v_agents) >0 :
-        neighbours = []
-        for agent in list_v_agents :
-            neighbours+= G_C.neighbors(agent, mode = 'all')
-            neighbours.append(agent)
-        for v in neighbours:
-            if decoupled_exec(G_M, [sources[len(list_v_agents)]], [v]) != None and decoupled_exec(G_M, [v], [targets[len(list_v_agents)]])!= None :
-                heapq.heappush(list_vertices, heuristic_compute(sources, targets, G_M, G_C, v, t, len(list_v_agents), list_v_agents))   
-    else : 
-        for v in range(G_M.vcount()):
-            if decoupled_exec(G_M, [sources[len(list_v_agents)]], [v]) != None and decoupled_exec(G_M, [v], [targets[len(list_v_agents)]])!= None :
-                heapq.heappush(list_vertices, heuristic_compute(sources, targets, G_M, G_C, v, t, len(list_v_agents), list_v_agents))
-    return list_vertices
 
 def recursive_func(sources, targets, G_C, G_M, t, list):
-    print("List = ", list)
-    if len(list) == len(sources):
-        exec_first = decoupled_exec(G_M, sources, list)
-        exec_second = decoupled_exec(G_M, list, targets)
-        if exec_first!= None and exec_second!= None :
-            exec_complete = concatanate_executions(exec_first, exec_second)
-            return list, exec_complete
-    else :
-        vertices = search_vertices(sources, targets, t, G_M, G_C, list)
-        print("possible vertices:", vertices)
-        for v in vertices:
-            list_final, exec = recursive_func(sources, targets, G_C, G_M, t, list+[v[2]])
-            if exec!=None:
-                if nb_conflicts(exec, G_C) == 0:
-                    return list_final, exec #todo
+    '''Middle configuration of best_choice, found by branch and bound (MiddleSearch) from the partial assignment list
+    Output: middle configuration, execution sources -> middle -> targets without conflict ((None, None) if none was found
+    within bb_max_nodes and bb_time_budget)'''
+    logger.debug("List = %s", list)
+    search = MiddleSearch(sources, targets, G_C, G_M, t, bb_max_nodes, bb_time_budget)
+    for i in range(len(list)): #the agents already placed are the first ones of every assignment
+        search.cost_tables[i] = np.where(np.arange(G_M.vcount()) == list[i], search.cost_tables[i], -1)
+    middle = search.run()
+    if instrumentation.enabled :
+        instrumentation.count("recursive_func_calls")
+        instrumentation.count("bb_nodes", search.nb_nodes)
+        instrumentation.count("bb_failed_partials", len(search.failed))
+    logger.debug("Branch and bound: %d placements tried, %d partial assignments memoized", search.nb_nodes, len(search.failed))
+    if middle == None :
         return None, None
+    exec_first = decoupled_exec(G_M, sources, middle)
+    exec_second = decoupled_exec(G_M, middle, targets)
+    if exec_first!= None and exec_second!= None :
+        exec_complete = concatanate_executions(exec_first, exec_second)
+        if nb_conflicts(exec_complete, G_C) == 0:
+            return middle, exec_complete
+    return None, None
 
 
 def best_choice(sources, targets, G_C, G_M, n):
+    if instrumentation.enabled :
+        instrumentation.count("best_choice_calls")
+        instrumentation.record_max("recursion_depth", nb_recursion-n)
     exec = decoupled_exec(G_M, sources, targets)
     if exec == None or len(exec)==1:
         return exec
-    print("Call number ", nb_recursion+1-n, ":", exec)
+    logger.debug("Call number %d: %s", nb_recursion+1-n, exec)
     if nb_conflicts(exec, G_C) == 0 :
-        print("No conflict at call ", nb_recursion+1-n)
+        logger.debug("No conflict at call %d", nb_recursion+1-n)
         return exec
     if n >0: #number of recursive calls = 10
-        print("nb conflicts = ", nb_conflicts(exec, G_C))
+        logger.debug("nb conflicts = %d", nb_conflicts(exec, G_C))
         t = pick_time_with_conflict(exec, G_C)
-        print("time", t)
-        list, exec_changed = recursive_func(sources, targets, G_C, G_M, t, [])
+        logger.debug("time %d", t)
+        with instrumentation.phase("recursive_func"):
+            list, exec_changed = recursive_func(sources, targets, G_C, G_M, t, [])
+        if list == None : #no middle configuration found: the part is left decoupled
+            return exec
         L1 =  best_choice(sources, list, G_C, G_M, n-1) 
         L2 = best_choice(list, targets, G_C, G_M, n-1)
         return concatanate_executions(L1, L2)
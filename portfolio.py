@@ -0,0 +1,60 @@
+import itertools
+import multiprocessing
+import os
+import numpy as np
+import mapfalgo
+import graphstore
+import segments
+
+#Parallel restarts of mapf_algo: the attempts (mapfalgo.mapf_attempt) run at the same time in a pool of processes,
+#each one with its own seed and its own order of the agents, and the first connected execution is returned
+
+_G_M = None
+_G_C = None
+_memo = None #parts solved by the attempts of this worker
+
+
+def _init_worker(G_Mname, G_Cname):
+    '''Load the graphs once per worker process'''
+    global _G_M, _G_C, _memo
+    _G_M = graphstore.as_graph(G_Mname)
+    _G_C = graphstore.as_graph(G_Cname)
+    _memo = segments.SegmentMemo()
+
+
+def _run_attempt(args):
+    seed, sources, targets, order = args
+    np.random.seed(seed)
+    return mapfalgo.mapf_attempt(_G_M, _G_C, sources, targets, _memo, order)
+
+
+def mapf_algo_portfolio(G_Mname, G_Cname, sources, targets, nb_workers = None, nb_attempts = None, seed = None):
+    '''Same result as mapfalgo.mapf_algo, but the attempts are launched concurrently.
+    The other attempts are stopped as soon as one of them returns a connected execution
+    Input: graphs names (or graphs already loaded), lists of sources and targets, number of processes (default: number of cores),
+    number of attempts (default: mapfalgo.nb_attemps), seed of the first attempt (attempt k uses seed+k)
+    Output: execution, None if no attempt succeeded
+    The orders are drawn once here with mapfalgo.choose_orders, so the attempts don't repeat an order while distinct ones
+    remain (when there are fewer orders than attempts, they are used again, as in mapf_algo)'''
+    if nb_attempts == None :
+        nb_attempts = mapfalgo.nb_attemps
+    if nb_workers == None :
+        nb_workers = os.cpu_count() or 1
+    nb_workers = max(1, min(nb_workers, nb_attempts))
+    if seed == None :
+        seed = np.random.randint(0, 2**31 - nb_attempts)
+    np.random.seed(seed)
+    G_C = graphstore.as_graph(G_Cname)
+    orders = list(itertools.islice(mapfalgo.choose_orders(G_C, sources), nb_attempts))
+    if len(orders) == 0 : #the agents can't be ordered
+        return None
+    tasks = [(seed + k, sources, targets, orders[k % len(orders)]) for k in range(nb_attempts)]
+    pool = multiprocessing.Pool(nb_workers, initializer = _init_worker, initargs = (G_Mname, G_Cname))
+    try:
+        for exec in pool.imap_unordered(_run_attempt, tasks):
+            if exec != None :
+                return exec
+        return None
+    finally:
+        pool.terminate()
+        pool.join()
@@ -1,54 +1,165 @@
+
 class PriorityQueue:
+    '''Indexed binary heap on the elements 0...nb_elements_max-1, with decrease-key and contains
+    heap is the array of the elements in heap order, position[element] its index in heap (-1 if it isn't in the queue),
+    priority[element] its priority. Each element is at most once in the heap, sift up / sift down are iterative
+    The arrays are allocated once: clear() only resets the elements still in the queue, so the same queue can be reused
+    by several searches'''
 
     def __init__(self, nb_elements_max):
-        self.heapsize = 0
-        self.heap = [(None, None) for i in range(nb_elements_max)]
-        self.dict = [-1 for element in range(nb_elements_max)]
-    
-    def pop(self):
-        min = self.heap[0]
-        self.dict[self.heap[self.heapsize-1][0]]=0
-        self.heap[0] = self.heap[self.heapsize-1]
-        self.heapsize-=1
-        self._bubbledown(0)
-        return min[0]
+        self.nb_elements_max = nb_elements_max
+        self.heapsize = 0 #number of elements in the queue
+        self.heap = [0 for element in range(nb_elements_max)]
+        self.position = [-1 for element in range(nb_elements_max)]
+        self.priority = [None for element in range(nb_elements_max)]
+
+    def _bubbleup(self, i):
+        heap, position, priority = self.heap, self.position, self.priority
+        element = heap[i]
+        p = priority[element]
+        while i > 0 :
+            parent = (i-1) >> 1
+            above = heap[parent]
+            if not((p, element) < (priority[above], above)):
+                break
+            heap[i] = above
+            position[above] = i
+            i = parent
+        heap[i] = element
+        position[element] = i
 
     def _bubbledown(self, i):
-        j = i
-        if 2*i+1< self.heapsize:
-            if self.heap[2*i+1][1]<self.heap[j][1]:
-                j = 2*i+1
-        if 2*i+2< self.heapsize:
-            if self.heap[2*i+2][1]<self.heap[j][1]:
-                j = 2*i+2
-        if i!=j:
-            self._swap(i, j)
-            self._bubbledown(j)
-    
-    def _swap(self, i, j):
-        self.heap[i], self.heap[j] = self.heap[j], self.heap[i]
-        self.dict[self.heap[i][0]] = i
-        self.dict[self.heap[j][0]] = j
+        heap, position, priority = self.heap, self.position, self.priority
+        size = self.heapsize
+        element = heap[i]
+        key = (priority[element], element)
+        while True :
+            child = 2*i + 1
+            if child >= size :
+                break
+            below = heap[child]
+            below_key = (priority[below], below)
+            if child+1 < size :
+                right = heap[child+1]
+                right_key = (priority[right], right)
+                if right_key < below_key :
+                    child, below, below_key = child+1, right, right_key
+            if not(below_key < key):
+                break
+            heap[i] = below
+            position[below] = i
+            i = child
+        heap[i] = element
+        position[element] = i
+
+    def pop(self):
+        '''Remove and return the element with the smallest priority (ties: the smallest element)'''
+        heap = self.heap
+        top = heap[0]
+        self.heapsize-=1
+        if self.heapsize > 0 :
+            heap[0] = heap[self.heapsize]
+            self._bubbledown(0)
+        self.position[top] = -1
+        self.priority[top] = None
+        return top
 
     def push(self, element, priority):
+        '''Add an element which isn't in the queue'''
+        self.priority[element] = priority
+        self.heap[self.heapsize] = element
         self.heapsize+=1
-        self.heap[self.heapsize-1]=[element, priority]
-        self.dict[element] = self.heapsize-1
         self._bubbleup(self.heapsize-1)
-    
-    def _bubbleup(self, i):
-        if i >0:
-            parent = (i-1)//2
-            if self.heap[i][1] < self.heap[parent][1]:
-                self._swap(i, parent)
-                self._bubbleup(parent)
-    
+
     def decrease(self, element, priority):
-        if self.dict[element]==-1:
+        '''Push the element, or lower its priority if it is already in the queue (a higher priority is ignored)'''
+        i = self.position[element]
+        if i == -1 :
             self.push(element, priority)
-        else :
-            self.heap[self.dict[element]][1]= priority
-            self._bubbleup(self.dict[element])
+        elif priority < self.priority[element] :
+            self.priority[element] = priority
+            self._bubbleup(i)
+
+    def contains(self, element):
+        return self.position[element] != -1
+
+    def __contains__(self, element):
+        return self.position[element] != -1
+
+    def __len__(self):
+        return self.heapsize
 
     def is_empty(self):
-        return (self.heapsize==0)
\ No newline at end of file
+        return (self.heapsize==0)
+
+    def clear(self):
+        '''Empty the queue without reallocating it'''
+        for i in range(self.heapsize):
+            element = self.heap[i]
+            self.position[element] = -1
+            self.priority[element] = None
+        self.heapsize = 0
+
+
+###Benchmark against a plain heapq with lazy deletion (Dijkstra on a grid with random weights)
+
+if __name__ == '__main__':
+    import heapq
+    import random
+    import time
+
+    side = 300
+    n = side*side
+    random.seed(0)
+    adj = [[] for v in range(n)]
+    for v in range(n):
+        if v % side < side-1 :
+            w = random.randint(1, 10)
+            adj[v].append((v+1, w))
+            adj[v+1].append((v, w))
+        if v + side < n :
+            w = random.randint(1, 10)
+            adj[v].append((v+side, w))
+            adj[v+side].append((v, w))
+
+    def dijkstra_indexed(queue, source):
+        queue.clear()
+        d = [-1]*n
+        done = [False]*n
+        d[source] = 0
+        queue.push(source, 0)
+        while not(queue.is_empty()):
+            x = queue.pop()
+            done[x] = True
+            for y, w in adj[x]:
+                if not(done[y]) and (d[y] == -1 or d[x]+w < d[y]):
+                    d[y] = d[x]+w
+                    queue.decrease(y, d[y])
+        return d
+
+    def dijkstra_heapq(source):
+        d = [-1]*n
+        done = [False]*n
+        d[source] = 0
+        heap = [(0, source)]
+        while len(heap) > 0 :
+            dx, x = heapq.heappop(heap)
+            if done[x] :
+                continue #lazy deletion: outdated entry
+            done[x] = True
+            for y, w in adj[x]:
+                if not(done[y]) and (d[y] == -1 or dx+w < d[y]):
+                    d[y] = dx+w
+                    heapq.heappush(heap, (d[y], y))
+        return d
+
+    queue = PriorityQueue(n)
+    sources = [random.randrange(n) for k in range(5)]
+    start = time.perf_counter()
+    res_indexed = [dijkstra_indexed(queue, s) for s in sources]
+    time_indexed = time.perf_counter()-start
+    start = time.perf_counter()
+    res_heapq = [dijkstra_heapq(s) for s in sources]
+    time_heapq = time.perf_counter()-start
+    print("same distances:", res_indexed == res_heapq)
+    print("PriorityQueue (reused):", time_indexed, "s, plain heapq:", time_heapq, "s")
@@ -0,0 +1,45 @@
+import numpy as np
+import execution
+
+#Memo of the segments solved by divide_and_conquer: a segment is the problem (start configuration -> end configuration)
+#Only connected executions are kept, they stay valid whatever the order of the agents and the remaining depth
+#The key is the sorted list of the (start, end) pairs of the agents, so a segment solved in one attempt
+#is found again in the next attempts even if choose_order gave another order
+
+max_segments = 10000 #the memo is emptied when it is full
+
+
+class SegmentMemo:
+    '''Connected executions of already solved segments, shared by the attempts on the same graphs'''
+
+    def __init__(self):
+        self.segments = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, sources, targets):
+        pairs = [(int(sources[a]), int(targets[a])) for a in range(len(sources))]
+        order = sorted(range(len(pairs)), key = lambda a : pairs[a])
+        return tuple(pairs[a] for a in order), order
+
+    def get(self, sources, targets):
+        '''Output: connected execution of the segment (agents in the order of sources), None if it isn't known'''
+        key, order = self._key(sources, targets)
+        canonical = self.segments.get(key)
+        if canonical is None :
+            self.misses += 1
+            return None
+        self.hits += 1
+        array = np.empty_like(canonical)
+        array[order] = canonical #row j of the memo is the path of agent order[j]
+        return execution.Execution(array)
+
+    def add(self, sources, targets, exec):
+        '''Keep a connected execution of the segment'''
+        key, order = self._key(sources, targets)
+        if len(self.segments) >= max_segments :
+            self.segments.clear()
+        self.segments[key] = np.asarray(exec)[order]
+
+    def __len__(self):
+        return len(self.segments)
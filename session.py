@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+import numpy as np
+import mapfalgo
+import graphstore
+import segments
+import distances
+import connectivity
+import heuristics
+
+#Session: solver bound to one pair of graphs (G_M, G_C), for streams of instances on the same maps.
+#The graphs are loaded once, and the structures built by the solver (distance oracle, paths, communication adjacency,
+#coordinates, solved segments) stay warm from one instance to the next
+#Usage: session = Session(G_Mname, G_Cname); for k, exec in session.solve_many([(sources, targets), ...]): ...
+
+_session = None #session of a worker process
+
+
+def _init_worker(G_Mname, G_Cname):
+    '''Build the session once per worker process'''
+    global _session
+    _session = Session(G_Mname, G_Cname)
+
+
+def _solve_task(args):
+    k, sources, targets, seed = args
+    return k, _session.solve(sources, targets, seed)
+
+
+class Session:
+    '''mapf_algo on a fixed pair of graphs, with its caches kept between the calls'''
+
+    def __init__(self, G_Mname, G_Cname, warm_up = True):
+        '''Input: graphs names (or graphs already loaded), warm_up to build the distance oracle, the communication adjacency
+        and the coordinates now instead of during the first solve'''
+        self.G_Mname = G_Mname
+        self.G_Cname = G_Cname
+        self.G_M = graphstore.as_graph(G_Mname)
+        self.G_C = graphstore.as_graph(G_Cname)
+        self.memo = segments.SegmentMemo() #a segment solved for one instance is valid for all the instances on these graphs
+        self.nb_solved = 0
+        if warm_up :
+            self.warm_up()
+
+    def warm_up(self):
+        distances.get_oracle(self.G_M)
+        connectivity.get_adjacency(self.G_C)
+        heuristics.get_coordinates(self.G_M)
+
+    def solve(self, sources, targets, seed = None):
+        '''Output: execution (see mapfalgo.mapf_algo), None if no connected execution was found
+        seed: if not None, np.random is seeded with it first'''
+        if seed != None :
+            np.random.seed(seed)
+        exec = mapfalgo.mapf_algo(self.G_M, self.G_C, sources, targets, self.memo)
+        self.nb_solved += 1
+        return exec
+
+    def solve_many(self, instances, nb_workers = 1, seed = None):
+        '''Solve the instances and give back the results as soon as they are found
+        Input: iterable of (sources, targets), number of processes (1: in this process, None: number of cores),
+        seed (instance k is solved after np.random.seed(seed+k): same results with or without processes)
+        Output: generator of (k, execution), k index of the instance (in the order of completion with several processes)'''
+        if nb_workers == None :
+            nb_workers = os.cpu_count() or 1
+        tasks = ((k, sources, targets, None if seed == None else seed + k) for k, (sources, targets) in enumerate(instances))
+        if nb_workers <= 1 :
+            for k, sources, targets, instance_seed in tasks :
+                yield k, self.solve(sources, targets, instance_seed)
+            return
+        #graphs given by name are loaded by each worker from graphstore, the others are sent with the initializer
+        pool = multiprocessing.Pool(nb_workers, initializer = _init_worker, initargs = (self.G_Mname, self.G_Cname))
+        try:
+            for k, exec in pool.imap_unordered(_solve_task, tasks):
+                self.nb_solved += 1
+                yield k, exec
+        finally:
+            pool.terminate()
+            pool.join()
@@ -1,91 +1,101 @@
 import numpy as np
-import math
-import igraph
-from copy import deepcopy
 import heapq
-from numpy import random
-import mapfalgo
+import logging
+import graphstore
+import closedset
+import instrumentation
+import distances
+import connectivity
+import execution
 
-import time 
-import os
-import sys
-sys.path.append(os.path.normpath(os.path.join(os.getcwd(),"../InternshipM1_CMAPF")))
-import configuration
-import closed_Tree
-import instance
-import heap_item
-import dfs_tateo
+#Tateo algorithm: depth first search in the space of the configurations. From the current configuration, the best child
+#(connected configuration where each agent waits or moves to a neighbour, not visited yet, with the smallest g + h)
+#is found by A* on the partial configurations, where the agents are placed one by one
+#configuration: tuple of vertices (configuration[a] is the vertex of agent a), the closed set is a closedset.ClosedSet
 
-def find_best_child(instance, current, targets, closed):
-    nb_total_agents = targets.nb_agent
-    heap = []
-    partial_config = configuration.Configuration([])
-    h_cost = dfs_tateo.compute_h(instance, current, partial_config)
-    #heap item structure is : ((h + g, -g, config), (g, h, config))
-    #Used to store g and h and compare only with g + h
-    item = heap_item.Heap_item((h_cost, 0, partial_config), 
-                     (0, h_cost, partial_config.copy())
-                     )
-    heap_item.heappush(heap, item)
-    while not heap == [] :
-        next_partial = heap_item.heappop(heap)
-        (current_g, _, partial_config) = next_partial.item
-        num_agent = partial_config.nb_agent
+closed_mode = "exact" #mode of the closed set: "exact" or "bloom" (see closedset.py)
+
+logger = logging.getLogger("tateo")
+
+
+class TateoInstance:
+    '''Data shared by all the searches of one instance: successors of the vertices in G_M (neighbours, then the vertex itself
+    for waiting), distances of every vertex to the target of each agent, adjacency of G_C'''
+
+    def __init__(self, G_M, G_C, targets):
+        oracle = distances.get_oracle(G_M)
+        self.targets = tuple(int(v) for v in targets)
+        self.successors = [tuple(oracle.adjlist_out[v]) + (v,) for v in range(G_M.vcount())]
+        self.dist_to_target = [oracle.distances_to(g).tolist() for g in self.targets] #-1 if the target can't be reached
+        self.adjacency = connectivity.get_adjacency(G_C)
+
+    def is_connected(self, config):
+        return bool(self.adjacency.connected_configs([config])[0])
+
+
+def find_best_child(instance, current, closed):
+    '''A* on the partial configurations: g is the number of agents which move, h the sum of the distances to the targets
+    (for the agents not placed yet, their current distance: a move toward the target keeps g + h the same)
+    Input: TateoInstance, current configuration, closed set
+    Output: best child of current (tuple), None if every connected child is closed'''
+    nb_total_agents = len(current)
+    remaining = [instance.dist_to_target[a][current[a]] for a in range(nb_total_agents)]
+    h_cost = sum(remaining)
+    #heap item structure is : (h + g, -g, partial configuration, h), the partial configurations are never copied
+    heap = [(h_cost, 0, (), h_cost)]
+    while len(heap) > 0 :
+        _, minus_g, partial_config, h_partial = heapq.heappop(heap)
+        num_agent = len(partial_config)
         if num_agent == nb_total_agents:
-            if mapfalgo.is_connected(partial_config.l_config, instance.comm_graph) \
-                and not closed.is_in(partial_config) \
-                and not partial_config.same(current):
+            if partial_config != current \
+                and not(partial_config in closed) \
+                and instance.is_connected(partial_config):
                     return partial_config
             continue
-        else:
-            successors = dfs_tateo.get_successors(instance, current.get_agent_pos(num_agent))
-            for node in successors:
-                new_config = partial_config.copy()
-                new_config.add_agent(node)
-                g_cost = current_g + dfs_tateo.compute_distance(
-                    current.get_agent_pos(num_agent), node)
-                h_cost = dfs_tateo.compute_h(instance, current, new_config)
-                if not h_cost == dfs_tateo.m.inf and not g_cost == dfs_tateo.m.inf:
-                    item = heap_item.Heap_item((h_cost + g_cost, - g_cost, 
-                                      new_config.copy()), 
-                                     (g_cost, h_cost, new_config.copy()))
-                    heap_item.heappush(heap, item)
-    return configuration.Configuration([])
+        position = current[num_agent]
+        dist = instance.dist_to_target[num_agent]
+        for node in instance.successors[position]:
+            if dist[node] == -1 :
+                continue
+            g_cost = -minus_g + (node != position)
+            h_cost = h_partial - remaining[num_agent] + dist[node]
+            heapq.heappush(heap, (h_cost + g_cost, -g_cost, partial_config + (node,), h_cost))
+    return None
+
 
 def tateo(G_Mname, G_Cname, sources, targets):
     '''Tateo algorithm
-    Input: graphs names, lists of sources and targets
+    Input: graphs names (or graphs already loaded), lists of sources and targets
     Output: execution'''
-    G_C = igraph.read(G_Cname)
-    G_M = igraph.read(G_Mname)
-    begin = configuration.Configuration(sources)
-    end = configuration.Configuration(targets)
-    first_instance = instance.Instance(G_M, G_C, begin, end, "astar")
-    stack = [begin]
+    G_C = graphstore.as_graph(G_Cname)
+    G_M = graphstore.as_graph(G_Mname)
+    begin = tuple(int(v) for v in sources)
+    first_instance = TateoInstance(G_M, G_C, targets)
+    end = first_instance.targets
     path = [begin]
-    closed = closed_Tree.Closed_tree()
-    while len(stack)>0:#??
-        current = path[-1]
-        closed.add_configuration(current)
-        if current.same(end):
-            path_agents = []
-            for a in range(len(path[0].l_config)):
-                path_a = []
-                for e in path :
-                    path_a.append(e.l_config[a])
-                path_agents.append(path_a)
-            return path_agents
-        best_child = find_best_child(first_instance, current, end, closed)
-        if not best_child.is_empty():
-            stack.insert(0, best_child)
-            path.append(best_child)
-        else:
-            stack.pop(0)
-            path.pop()
-    print("Cannot find a path")
-    return None
+    closed = closedset.ClosedSet(G_M.vcount(), len(begin), closed_mode)
+    try:
+        while len(path)>0:
+            current = path[-1]
+            closed.add(current)
+            if current == end:
+                return execution.Execution(np.array(path, dtype = np.int64).T)
+            best_child = find_best_child(first_instance, current, closed)
+            if best_child != None:
+                path.append(best_child)
+            else:
+                path.pop()
+        print("Cannot find a path")
+        return None
+    finally:
+        stats = closed.stats()
+        logger.debug("Closed set: %s", stats)
+        if instrumentation.enabled :
+            instrumentation.count("closed_lookups", stats["lookups"])
+            instrumentation.count("closed_hits", stats["hits"])
+            instrumentation.record_max("closed_entries", stats["entries"])
+            instrumentation.record_max("closed_memory_bytes", stats["memory_bytes"])
 
 
 if __name__== "__main__":
     0
-    
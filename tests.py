@@ -1,6 +1,9 @@
 import sys
 import mapfalgo
 import tateo
+import closedset
+import graphstore
+import instances
 
 import json
 import subprocess
@@ -13,58 +16,36 @@ sys.path.append(os.path.normpath(os.path.join(os.getcwd(),"../cmapf-gui")))
 import create_graph_from_png
 
 def create_instance(G_Mname, G_Cname, G_size):
-    G_C = igraph.read(G_Cname)
-    G_M = igraph.read(G_Mname)
+    G_C = graphstore.as_graph(G_Cname)
+    G_M = graphstore.as_graph(G_Mname)
     nb_agent = np.random.randint(10,20,1)[0]-1
-    sources = choose_config(G_C,np.random.randint(0,G_M.vcount(),1)[0], nb_agent)
+    sources = instances.choose_config(G_C,np.random.randint(0,G_M.vcount(),1)[0], nb_agent)
     #create an execution 
     print("sources are", sources)
     #nb_steps = 50
     #last_seen=[[sources[a],sources[a], sources[a],sources[a]] for a in range(nb_agent)]
-    fake_first_chosen = sources[0]
-    nb_find = 20
-    dist_max = 0
-    while nb_find>0:
-        fake_first = np.random.randint(0,G_M.vcount(),1)[0]
-        if mapfalgo.get_distance(G_M, sources[0], fake_first)>dist_max:
-            fake_first_chosen=fake_first
-            dist_max = mapfalgo.get_distance(G_M, sources[0], fake_first)
-        nb_find-=1
-    fake_targets= choose_config(G_C, fake_first_chosen, nb_agent)
+    fake_first_chosen = instances.far_vertex(G_M, sources[0])
+    fake_targets= instances.choose_config(G_C, fake_first_chosen, nb_agent)
     targets = tateo_construct_targets(G_M, G_C, sources, fake_targets)
     print("targets are", targets)
     return sources, targets
 
-def choose_config(G_C, first_vertex, nb_agent):
-    config = [first_vertex]
-    neighbours = G_C.neighbors(config[0])
-    for n in range(nb_agent):
-        config.append(np.random.choice(neighbours,1)[0])
-        for i in G_C.neighbors(config[-1]):
-            if not(i in neighbours):
-                neighbours.append(i)
-    return config
-
 def tateo_construct_targets(G_M, G_C, sources, targets):
-    begin = tateo.configuration.Configuration(sources)
-    end = tateo.configuration.Configuration(targets)
-    first_instance = tateo.instance.Instance(G_M, G_C, begin, end, "astar")
-    stack = [begin]
-    path = [begin]
-    closed = tateo.closed_Tree.Closed_tree()
+    first_instance = tateo.TateoInstance(G_M, G_C, targets)
+    end = first_instance.targets
+    path = [tuple(int(v) for v in sources)]
+    closed = closedset.ClosedSet(G_M.vcount(), len(sources))
     nb_steps = 20
     while nb_steps>=0:
         print("nb_steps left", nb_steps)
         current = path[-1]
-        closed.add_configuration(current)
-        if nb_steps ==0 or current.same(end):
-            return current.l_config
-        best_child = tateo.find_best_child(first_instance, current, end, closed)
-        if not best_child.is_empty():
-            stack.insert(0, best_child)
+        closed.add(current)
+        if nb_steps ==0 or current == end:
+            return list(current)
+        best_child = tateo.find_best_child(first_instance, current, closed)
+        if best_child != None:
             path.append(best_child)
         else:
-            stack.pop(0)
             path.pop()
         nb_steps-=1
     return None
@@ -88,11 +69,13 @@ def makeTests(png):
     for n in range(nb_instance):
         radius = np.random.randint(3, size[1]//10)
         physFileName, commFileName = create_graph_from_png.cgfpng(radius, png)
+        G_M = graphstore.load_graph(physFileName)
+        G_C = graphstore.load_graph(commFileName)
         start = time.time()
-        init, target = create_instance(physFileName, commFileName, size)
-        sol_divide_and_conquer = mapfalgo.mapf_algo(physFileName, commFileName, init, target)
+        init, target = create_instance(G_M, G_C, size)
+        sol_divide_and_conquer = mapfalgo.mapf_algo(G_M, G_C, init, target)
         time_divide_and_conquer = time.time()
-        sol_tateo = tateo.tateo(physFileName, commFileName, init, target)
+        sol_tateo = tateo.tateo(G_M, G_C, init, target)
         end = time.time()
         results.append([len(sol_divide_and_conquer[0]), time_divide_and_conquer-start, len(sol_tateo[0]), end-time_divide_and_conquer])
     return results